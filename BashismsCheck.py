@@ -3,37 +3,171 @@
 # Purpose       : check /bin/sh shell scripts for bashisms
 #############################################################################
 
+import concurrent.futures
+import os
+import shutil
 import stat
 
 import AbstractCheck
+import Config
+import FileSniffer
+import HeaderFiles
+import PayloadAccess
 import Pkg
-from Filter import printWarning, printInfo, addDetails
+import ResultCache
+import ShellSyntax
+from Filter import addDetails
 
+# confirm syntax errors found by ShellSyntax with dash -n, if available
+DASH_CONFIRM = Config.getOption('BashismsCheck.ConfirmWithDash', True)
+
+# number of dash -n processes run in parallel, 0 for one per CPU
+DASH_JOBS = Config.getOption('BashismsCheck.Jobs', 0)
+DASH_JOBS = max(1, DASH_JOBS or os.cpu_count() or 1)
+
+# number of scripts passed to a single checkbashisms call
+BATCH_SIZE = Config.getOption('BashismsCheck.BatchSize', 100)
+
+
+def shell_syntax_error(path):
+    """Returns whether the in-process parser finds a syntax error in the
+    script at @path, None if it cannot tell."""
+
+    try:
+        with open(path, 'rb') as fd:
+            text = fd.read().decode('latin-1')
+        ShellSyntax.parse(text)
+    except ShellSyntax.ShellSyntaxError:
+        return True
+    except RecursionError:
+        return None
+    except (IOError, OSError):
+        return False
+    return False
+
+
+def dash_syntax_error(path):
+    """Returns whether dash -n rejects the script at @path, None if dash
+    is not available."""
+
+    try:
+        status, output = Pkg.getstatusoutput(["dash", "-n", path])
+    except FileNotFoundError:
+        return None
+    except UnicodeDecodeError:
+        return False
+    return status == 2
+
+
+def checkbashisms(paths):
+    """Runs checkbashisms on all of @paths at once and returns the set of
+    paths it found potential bashisms in. Returns None if its output could
+    not be attributed to the single files."""
+
+    try:
+        status, output = Pkg.getstatusoutput(["checkbashisms"] + paths)
+    except (FileNotFoundError, UnicodeDecodeError):
+        return set()
+
+    if status not in (0, 1):
+        return None
+    if len(paths) == 1:
+        return set(paths) if status == 1 else set()
+
+    ret = set()
+    for line in output.splitlines():
+        if not line.startswith('possible bashism in '):
+            continue
+        line = line[len('possible bashism in '):]
+        for path in paths:
+            if line.startswith(path + ' line '):
+                ret.add(path)
+                break
+
+    # status 1 means there are bashisms in at least one of the files
+    if bool(ret) != (status == 1):
+        return None
+    return ret
+
+
+class BashismsCheck(AbstractCheck.AbstractCheck):
+    needs_payload = True
 
-class BashismsCheck(AbstractCheck.AbstractFilesCheck):
     def __init__(self):
-        AbstractCheck.AbstractFilesCheck.__init__(self, "BashismsCheck", ".*")
+        AbstractCheck.AbstractCheck.__init__(self, "BashismsCheck")
+        PayloadAccess.register("BashismsCheck",
+                               file_type=FileSniffer.is_shell_script)
+        self.cache = ResultCache.ResultCache('BashismsCheck', 1)
+        # the findings differ with the tools that are not installed, they
+        # must not be taken from the cache once they are
+        self.cache_config = (
+            DASH_CONFIRM and shutil.which('dash') is not None,
+            shutil.which('checkbashisms') is not None)
+
+    def check(self, pkg):
+        files = HeaderFiles.files(pkg)
+        self.scripts = [f for f in PayloadAccess.files(pkg, "BashismsCheck")
+                        if stat.S_ISREG(files[f].mode)]
+
+        findings = {}
+        todo = []
+        for filename in self.scripts:
+            cached = self.cache.lookup(files[filename], self.cache_config)
+            if cached is None:
+                todo.append(filename)
+            else:
+                findings[filename] = cached
+
+        if todo:
+            findings.update(self.check_scripts(pkg, todo))
+            for filename in todo:
+                self.cache.store(files[filename], findings[filename],
+                                 self.cache_config)
+
+        for filename in self.scripts:
+            ResultCache.report(pkg, filename, findings[filename])
+        PayloadAccess.release(pkg, "BashismsCheck")
+
+    def check_scripts(self, pkg, scripts):
+        """Returns the findings for each of the shell @scripts."""
+
+        paths = [PayloadAccess.path(pkg, f) for f in scripts]
 
-    def check_file(self, pkg, filename):
-        pkgfile = pkg.files()[filename]
+        syntax_errors = [shell_syntax_error(path) for path in paths]
+        suspects = [i for i, error in enumerate(syntax_errors)
+                    if error is not False]
+        if suspects and DASH_CONFIRM:
+            with concurrent.futures.ThreadPoolExecutor(DASH_JOBS) as executor:
+                confirmed = executor.map(dash_syntax_error,
+                                         [paths[i] for i in suspects])
+                for i, error in zip(suspects, confirmed):
+                    if error is not None:
+                        syntax_errors[i] = error
 
-        if not (stat.S_ISREG(pkgfile.mode) and
-                pkgfile.magic.startswith('POSIX shell script')):
-            return
+        bashisms = set()
+        for i in range(0, len(paths), BATCH_SIZE):
+            batch = paths[i:i + BATCH_SIZE]
+            found = checkbashisms(batch)
+            if found is None:
+                # fall back to one call per script
+                found = set()
+                for path in batch:
+                    if checkbashisms([path]):
+                        found.add(path)
+            bashisms |= found
 
-        try:
-            status, output = Pkg.getstatusoutput(["dash", "-n", filename])
-            if status == 2:
-                printWarning(pkg, "bin-sh-syntax-error", filename)
-            status, output = Pkg.getstatusoutput(
-                ["checkbashisms", filename])
-            if status == 1:
-                printInfo(pkg, "potential-bashisms", filename)
-        except (FileNotFoundError, UnicodeDecodeError):
-            pass
+        findings = {}
+        for filename, path, syntax_error in zip(scripts, paths,
+                                                syntax_errors):
+            findings[filename] = []
+            if syntax_error:
+                findings[filename].append(('W', "bin-sh-syntax-error"))
+            if path in bashisms:
+                findings[filename].append(('I', "potential-bashisms"))
+        return findings
 
 
-check = BashismsCheck()
+check = HeaderFiles.register(BashismsCheck())
 
 addDetails(
 'bin-sh-syntax-error',
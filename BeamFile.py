@@ -0,0 +1,175 @@
+# vim: sw=4 ts=4 sts=4 et :
+#############################################################################
+# Purpose       : minimal in-process reader for the compile info of BEAM files
+#############################################################################
+
+# A BEAM file is an IFF container of chunks. Only the CInf chunk, holding
+# the compiler options and the source file in the external term format, is
+# looked at, all other chunks are skipped without being read.
+
+import gzip
+import struct
+import zlib
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+# external term format tags, see erl_ext_dist(7)
+VERSION_MAGIC = 131
+NEW_FLOAT_EXT = 70
+BIT_BINARY_EXT = 77
+COMPRESSED = 80
+SMALL_INTEGER_EXT = 97
+INTEGER_EXT = 98
+FLOAT_EXT = 99
+ATOM_EXT = 100
+SMALL_TUPLE_EXT = 104
+LARGE_TUPLE_EXT = 105
+NIL_EXT = 106
+STRING_EXT = 107
+LIST_EXT = 108
+BINARY_EXT = 109
+SMALL_BIG_EXT = 110
+LARGE_BIG_EXT = 111
+SMALL_ATOM_EXT = 115
+MAP_EXT = 116
+ATOM_UTF8_EXT = 118
+SMALL_ATOM_UTF8_EXT = 119
+
+
+class BeamError(Exception):
+    pass
+
+
+class Atom(str):
+    """An Erlang atom, equal to the str of its name. Strings and binaries
+    are decoded to bytes, so they cannot be confused with atoms."""
+
+    def __repr__(self):
+        return 'Atom(%s)' % str.__repr__(self)
+
+
+def _read(fd, size):
+    data = fd.read(size)
+    if len(data) != size:
+        raise BeamError("truncated BEAM file")
+    return data
+
+
+def find_chunk(fd, chunk_id):
+    """Returns the data of the first chunk @chunk_id of the BEAM file open
+    as @fd, None if there is none. Other chunks are skipped by seeking."""
+
+    form, _, kind = struct.unpack('>4sI4s', _read(fd, 12))
+    if form != b'FOR1' or kind != b'BEAM':
+        raise BeamError("not a BEAM file")
+
+    while True:
+        header = fd.read(8)
+        if len(header) < 8:
+            return None
+        cid, size = struct.unpack('>4sI', header)
+        if cid == chunk_id:
+            return _read(fd, size)
+        # chunks are padded to a multiple of four bytes
+        fd.seek((size + 3) & ~3, 1)
+
+
+class _Decoder(object):
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def take(self, size):
+        if self.pos + size > len(self.data):
+            raise BeamError("truncated term")
+        ret = self.data[self.pos:self.pos + size]
+        self.pos += size
+        return ret
+
+    def unpack(self, fmt):
+        return struct.unpack(fmt, self.take(struct.calcsize(fmt)))
+
+    def term(self):
+        tag = self.take(1)[0]
+        if tag == SMALL_INTEGER_EXT:
+            return self.take(1)[0]
+        if tag == INTEGER_EXT:
+            return self.unpack('>i')[0]
+        if tag in (ATOM_EXT, ATOM_UTF8_EXT):
+            return Atom(self.take(self.unpack('>H')[0]).decode('utf-8'))
+        if tag in (SMALL_ATOM_EXT, SMALL_ATOM_UTF8_EXT):
+            return Atom(self.take(self.take(1)[0]).decode('utf-8'))
+        if tag == SMALL_TUPLE_EXT:
+            return tuple(self.term() for _ in range(self.take(1)[0]))
+        if tag == LARGE_TUPLE_EXT:
+            return tuple(self.term() for _ in range(self.unpack('>I')[0]))
+        if tag == NIL_EXT:
+            return []
+        if tag == STRING_EXT:
+            return self.take(self.unpack('>H')[0])
+        if tag == LIST_EXT:
+            ret = [self.term() for _ in range(self.unpack('>I')[0])]
+            tail = self.term()
+            if tail != []:
+                ret.append(tail)
+            return ret
+        if tag == BINARY_EXT:
+            return self.take(self.unpack('>I')[0])
+        if tag == BIT_BINARY_EXT:
+            size = self.unpack('>I')[0]
+            self.take(1)
+            return self.take(size)
+        if tag in (SMALL_BIG_EXT, LARGE_BIG_EXT):
+            size = self.take(1)[0] if tag == SMALL_BIG_EXT else \
+                self.unpack('>I')[0]
+            sign = self.take(1)[0]
+            value = int.from_bytes(self.take(size), 'little')
+            return -value if sign else value
+        if tag == NEW_FLOAT_EXT:
+            return self.unpack('>d')[0]
+        if tag == FLOAT_EXT:
+            return float(self.take(31).split(b'\0')[0])
+        if tag == MAP_EXT:
+            return dict((self.term(), self.term())
+                        for _ in range(self.unpack('>I')[0]))
+        raise BeamError("unsupported term tag %d" % tag)
+
+
+def decode_term(data):
+    """Decodes the term in external term format @data. Lists of small
+    integers come back as bytes, like strings."""
+
+    if not data or data[0] != VERSION_MAGIC:
+        raise BeamError("not in external term format")
+    if len(data) > 1 and data[1] == COMPRESSED:
+        try:
+            data = data[:1] + zlib.decompress(data[6:])
+        except zlib.error as e:
+            raise BeamError(str(e))
+    decoder = _Decoder(data)
+    decoder.pos = 1
+    return decoder.term()
+
+
+def compile_info(fd):
+    """Returns the compile info of the BEAM file open as @fd as a dictionary
+    like {'options': [...], 'source': b'...'}, possibly gzip compressed."""
+
+    magic = fd.read(2)
+    fd.seek(0)
+    if magic == GZIP_MAGIC:
+        fd = gzip.GzipFile(fileobj=fd)
+
+    try:
+        data = find_chunk(fd, b'CInf')
+    except (OSError, EOFError, zlib.error) as e:
+        raise BeamError(str(e))
+    if data is None:
+        raise BeamError("no CInf chunk")
+
+    info = decode_term(data)
+    if not isinstance(info, list):
+        raise BeamError("unexpected compile info")
+    return dict(item for item in info
+                if isinstance(item, tuple) and len(item) == 2)
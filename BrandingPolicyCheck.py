@@ -8,10 +8,14 @@
 
 from Filter import addDetails, printError
 import AbstractCheck
+import DependencyIndex
+import HeaderFiles
 import rpm
 
 
 class BrandingPolicyCheck(AbstractCheck.AbstractCheck):
+    needs_payload = False
+
     def __init__(self):
         self.map = []
         AbstractCheck.AbstractCheck.__init__(self, "BrandingPolicyCheck")
@@ -20,10 +24,10 @@ class BrandingPolicyCheck(AbstractCheck.AbstractCheck):
         if pkg.isSource():
             return
 
-        pkg_conflicts = set(map(lambda x: x[0], pkg.conflicts()))
+        deps = DependencyIndex.get(pkg)
 
         # verify that only generic branding is required by non-branding packages
-        for r in pkg.requires():
+        for r in deps.requires:
             if r[0].startswith("config("):
                 continue
             if ('-branding-' not in pkg.name and
@@ -42,12 +46,10 @@ class BrandingPolicyCheck(AbstractCheck.AbstractCheck):
         branding_style = pkg.name.partition('-branding-')[2]
         generic_branding = ("%s-branding" % (branding_basename))
 
-        pkg_supplements = set(map(lambda x: x[0], pkg.supplements()))
-
         # verify that it only supplements with packageand
         found_packageand_supplement = False
         correct_supplement = "packageand(%s:branding-%s)" % (branding_basename, branding_style)
-        for s in pkg_supplements:
+        for s in deps.supplements.names:
             if s.startswith('packageand('):
                 if s != correct_supplement:
                     printError(pkg, 'suse-branding-wrong-branding-supplement', s)
@@ -59,29 +61,19 @@ class BrandingPolicyCheck(AbstractCheck.AbstractCheck):
             printError(pkg, 'suse-branding-supplement-missing', correct_supplement)
 
         # nothing else
-        for r in pkg.recommends():
+        for r in deps.recommends:
             printError(pkg, 'suse-branding-excessive-recommends', r[0])
-        for r in pkg.suggests():
+        for r in deps.suggests:
             printError(pkg, 'suse-branding-excessive-suggests', r[0])
-        for r in pkg.enhances():
+        for r in deps.enhances:
             printError(pkg, 'suse-branding-excessive-enhances', r[0])
 
         # check for provide foo-branding
-        branding_provide = None
-        for p in pkg.provides():
-            if p[0] == generic_branding:
-                branding_provide = p
-                break
+        branding_provide = deps.provides.get(generic_branding)
 
         # check for Conflicts: kde4-kdm-branding
         conflict_prop = "%s" % (generic_branding)
-        have_conflict_prop = False
-        for c in pkg_conflicts:
-            if c == conflict_prop:
-                have_conflict_prop = True
-                break
-
-        if not have_conflict_prop:
+        if conflict_prop not in deps.conflicts:
             printError(pkg, 'suse-branding-missing-conflicts', conflict_prop)
 
         if not branding_provide:
@@ -91,7 +83,7 @@ class BrandingPolicyCheck(AbstractCheck.AbstractCheck):
                 printError(pkg, 'suse-branding-unversioned-provides', branding_provide[0])
 
 
-check = BrandingPolicyCheck()
+check = HeaderFiles.register(BrandingPolicyCheck())
 
 addDetails(
 'suse-branding-branding-conflict',
@@ -9,11 +9,15 @@
 from Filter import addDetails, printError
 import AbstractCheck
 import Config
+import DependencyIndex
+import HeaderFiles
 
 xinetd_tag = 'suse-obsolete-xinetd-requirement'
 
 
 class Check4Xinetd(AbstractCheck.AbstractFilesCheck):
+    needs_payload = False
+
     def __init__(self):
         self.map = []
         AbstractCheck.AbstractCheck.__init__(self, 'Check4Xinetd')
@@ -22,12 +26,11 @@ class Check4Xinetd(AbstractCheck.AbstractFilesCheck):
         if pkg.isSource():
             return
 
-        for req in pkg.requires() + pkg.prereq():
-            if req[0] == 'xinetd':
-                printError(pkg, xinetd_tag)
+        if 'xinetd' in DependencyIndex.get(pkg).all_requires:
+            printError(pkg, xinetd_tag)
 
 
-check = Check4Xinetd()
+check = HeaderFiles.register(Check4Xinetd())
 
 if Config.info:
     addDetails(
@@ -7,39 +7,61 @@
 
 import AbstractCheck
 import Config
+import ContentScanner
 import Filter
+import HeaderFiles
 import re
+import ResultCache
 import stat
 import time
 
 
 class BuildDateCheck(AbstractCheck.AbstractFilesCheck):
+    needs_payload = True
+
     def __init__(self):
         AbstractCheck.AbstractFilesCheck.__init__(self, "CheckBuildDate", ".*")
         self.looksliketime = re.compile(
             '(2[0-3]|[01]?[0-9]):([0-5]?[0-9]):([0-5]?[0-9])')
         self.istoday = re.compile(time.strftime("%b %e %Y"))
+        ContentScanner.register('CheckBuildDate.date', self.istoday,
+                                r'(?!/usr/lib/debug)', elf_sections=True)
+        ContentScanner.register('CheckBuildDate.time', self.looksliketime,
+                                r'(?!/usr/lib/debug)',
+                                only_if='CheckBuildDate.date',
+                                elf_sections=True)
+        self.cache = ResultCache.ResultCache('CheckBuildDate', 1)
 
     def check_file(self, pkg, filename):
         if filename.startswith('/usr/lib/debug') or pkg.isSource():
             return
 
-        if not stat.S_ISREG(pkg.files()[filename].mode):
+        pkgfile = HeaderFiles.files(pkg)[filename]
+        if not stat.S_ISREG(pkgfile.mode):
             return
 
-        grep_date = pkg.grep(self.istoday, filename)
+        findings = self.cache.get(
+            pkgfile, lambda: self.file_findings(pkg, filename),
+            (self.istoday.pattern, ContentScanner.MAX_FILE_BYTES))
+        ResultCache.report(pkg, filename, findings)
+
+    def file_findings(self, pkg, filename):
+        grep_date = ContentScanner.search(pkg, 'CheckBuildDate.date', filename)
+        if ContentScanner.unreadable(pkg, filename):
+            return None
 
         if len(grep_date):
-            grep_time = pkg.grep(self.looksliketime, filename)
+            grep_time = ContentScanner.search(pkg, 'CheckBuildDate.time',
+                                              filename)
 
             if len(grep_time):
-                Filter.printError(pkg, "file-contains-date-and-time", filename)
+                return [('E', "file-contains-date-and-time")]
             else:
-                Filter.printWarning(pkg, "file-contains-current-date",
-                                    filename)
+                return [('W', "file-contains-current-date")]
+        return []
 
 
-check = BuildDateCheck()
+check = HeaderFiles.register(BuildDateCheck())
 
 if Config.info:
     Filter.addDetails(
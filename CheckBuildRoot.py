@@ -8,31 +8,50 @@
 
 import AbstractCheck
 import Config
+import ContentScanner
 import Filter
+import HeaderFiles
 import re
+import ResultCache
 import rpm
 import stat
 
 
 class BuildRootCheck(AbstractCheck.AbstractFilesCheck):
+    needs_payload = True
+
     def __init__(self):
         AbstractCheck.AbstractFilesCheck.__init__(self, "CheckBuildRoot", ".*")
         t = rpm.expandMacro('%buildroot')
         for m in ('name', 'version', 'release', 'NAME', 'VERSION', 'RELEASE'):
             t = t.replace("%%{%s}" % (m), r'[\w\!-\.]{1,20}')
         self.build_root_re = re.compile(t)
+        ContentScanner.register('CheckBuildRoot', self.build_root_re,
+                                r'(?!/usr/lib/debug)', elf_sections=True)
+        self.cache = ResultCache.ResultCache('CheckBuildRoot', 1)
 
     def check_file(self, pkg, filename):
         if filename.startswith('/usr/lib/debug') or pkg.isSource():
             return
-        if not stat.S_ISREG(pkg.files()[filename].mode):
+        pkgfile = HeaderFiles.files(pkg)[filename]
+        if not stat.S_ISREG(pkgfile.mode):
             return
 
-        if len(pkg.grep(self.build_root_re, filename)):
-            Filter.printError(pkg, "file-contains-buildroot", filename)
+        findings = self.cache.get(
+            pkgfile, lambda: self.file_findings(pkg, filename),
+            (self.build_root_re.pattern, ContentScanner.MAX_FILE_BYTES))
+        ResultCache.report(pkg, filename, findings)
+
+    def file_findings(self, pkg, filename):
+        hits = ContentScanner.search(pkg, 'CheckBuildRoot', filename)
+        if ContentScanner.unreadable(pkg, filename):
+            return None
+        if len(hits):
+            return [('E', "file-contains-buildroot")]
+        return []
 
 
-check = BuildRootCheck()
+check = HeaderFiles.register(BuildRootCheck())
 
 if Config.info:
     Filter.addDetails(
@@ -6,42 +6,113 @@
 
 import AbstractCheck
 import Config
+import ContentScanner
 import Filter
+import HeaderFiles
+import json
+import os
 import re
 
+# JSON files mapping error tags to the digests of well known files, like
+#
+# "generic-build-instructions": {
+#     "level": "error",
+#     "details": "...",
+#     "digests": [
+#         "c59cbaf0df9bcf35feca0d0f1fc01dae",
+#         {"file": "INSTALL of automake 1.16", "md5": "...", "sha256": "..."},
+#         ...
+#     ]
+# }
+#
+# digests are compared against the file digests in the package header. As
+# these use the digest algorithm the package was built with, files are best
+# listed with both their md5 and sha256 digest. Only %doc files are looked
+# up, automake, libtool and the like ship these files on purpose.
+FINGERPRINT_FILES = Config.getOption('CheckCommonFiles.Fingerprints', (
+    os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                 'common-files-fingerprints.json'),
+))
+
+
+class FingerprintDatabase(object):
+    """Hash indexed table of known file digests, loaded from the
+    FINGERPRINT_FILES."""
+
+    LEVELS = {
+        'error': Filter.printError,
+        'warning': Filter.printWarning,
+        'info': Filter.printInfo,
+    }
+
+    # keys of the digests of a file entry
+    ALGORITHMS = ('md5', 'sha256')
+
+    def __init__(self):
+        # digest -> (print function, tag)
+        self.digests = {}
+        # tag -> details
+        self.details = {}
+
+    def load(self, path):
+        try:
+            with open(path) as fd:
+                data = json.load(fd)
+
+            for tag, entry in data.items():
+                level = self.LEVELS[entry.get('level', 'warning')]
+                if 'details' in entry:
+                    self.details[tag] = entry['details']
+                for digest in entry['digests']:
+                    if isinstance(digest, dict):
+                        digests = [digest[alg] for alg in self.ALGORITHMS
+                                   if alg in digest]
+                    else:
+                        digests = [digest]
+                    for d in digests:
+                        self.digests[d.lower()] = (level, tag)
+        except Exception as e:
+            raise Exception("{}: ERROR: Failed to parse fingerprints: {}".format(
+                path, e))
+
+    def lookup(self, digest):
+        return self.digests.get(digest)
+
 
 class CommonFilesCheck(AbstractCheck.AbstractCheck):
+    # only the makefile-junk test reads file contents, it is skipped with
+    # HeaderOnly
+    needs_payload = False
+
     def __init__(self):
         self.map = []
         AbstractCheck.AbstractCheck.__init__(self, "CheckCommonFiles")
+        self.fingerprints = FingerprintDatabase()
+        for path in FINGERPRINT_FILES:
+            if os.path.exists(path):
+                self.fingerprints.load(path)
         self.sources_am_re = re.compile(
             r'([\w\d_]+_SOURCES\s*=|\s*SUBDIRS\s*=)')
+        ContentScanner.register('CheckCommonFiles.sources_am',
+                                self.sources_am_re, r'.*/Makefile\.am$')
 
     def check(self, pkg):
 
         if pkg.isSource():
             return
-        files = pkg.files()
+        files = HeaderFiles.files(pkg)
+        ghost_files = HeaderFiles.ghost_files(pkg)
+        doc_files = HeaderFiles.doc_files(pkg)
         for f in files:
-            if f in pkg.ghostFiles():
+            if f in ghost_files:
                 continue
             md5 = files[f].md5
 
-            if len(md5) and md5 in (
-                    'c59cbaf0df9bcf35feca0d0f1fc01dae',
-                    'cf8c4d1a5ab88db006c47ae2b51a6b30',
-                    '5d4638159851671944108691f23e4f28',
-                    '0d6be33865b76025c20b48bcac87adb7'):
-                Filter.printError(pkg, "generic-build-instructions", f)
-
-            # bnc 379919
-            # if len(md5) and md5 in (
-            #        '94d55d512a9ba36caa9b7df079bae19f'):
-            #    printError(pkg, "duplicated-file-gpl-v2", f)
-
-            # if len(md5) and md5 in (
-            #        'd32239bcb673463ab874e80d47fae504'):
-            #    printError(pkg, "duplicated-file-gpl-v3", f)
+            known = len(md5) and f in doc_files and \
+                self.fingerprints.lookup(md5)
+            if known:
+                level, tag = known
+                level(pkg, tag, f)
 
             # bsd causes the false positive COPYING.BSD
             if (len(md5) and f.rsplit('/', 1)[1][0].lower() == 'r' and
@@ -50,31 +121,24 @@ class CommonFilesCheck(AbstractCheck.AbstractCheck):
                     'tru64', 'sco', 'vms', 'win32', 'win', 'solaris')):
                 Filter.printWarning(pkg, "non-linux-readme", f)
 
-            if (f.endswith("/Makefile.am") and f[:-3] + ".in" in files and
-                    f in pkg.docFiles()):
-                if not len(pkg.grep(self.sources_am_re, f)):
+            if (not HeaderFiles.HEADER_ONLY and
+                    f.endswith("/Makefile.am") and f[:-3] + ".in" in files and
+                    f in doc_files):
+                if not len(ContentScanner.search(
+                        pkg, 'CheckCommonFiles.sources_am', f)):
                     Filter.printError(pkg, "makefile-junk", f)
                     Filter.printError(pkg, "makefile-junk", f[:-3] + ".in")
                     if f[:-3] in files:
                         Filter.printError(pkg, "makefile-junk", f[:-3])
 
 
-check = CommonFilesCheck()
+check = HeaderFiles.register(CommonFilesCheck())
 
 if Config.info:
+    for tag, details in check.fingerprints.details.items():
+        Filter.addDetails(tag, details)
+
     Filter.addDetails(
-'generic-build-instructions',
-"""Your package contains a file that contains the FSF generic
-configure/make/make install instructions. Those are useless
-for a binary package. Consider removing it to save 3kb of rpm size.""",
-'duplicated-file-gpl-v3',
-"""Your package contains a file that contains the FSF GPLv3
-license. If you really have to ship it, consider symlinking it
-from the licenses package.""",
-'duplicated-file-gpl-v2',
-"""Your package contains a file that contains the FSF GPLv2
-license. If you really have to ship it, consider symlinking it
-from the licenses package.""",
 'non-linux-readme',
 """Your package contains a file that contains instructions
 for non-linux platforms. They're most likely unneccessary bloat,
@@ -8,6 +8,7 @@ import os
 
 import AbstractCheck
 import Config
+import HeaderFiles
 import Whitelisting
 
 from Filter import addDetails
@@ -19,6 +20,8 @@ WHITELIST_DIR = Config.getOption('WhitelistDataDir', [])
 
 class CronCheck(AbstractCheck.AbstractCheck):
 
+    needs_payload = True
+
     def __init__(self):
         AbstractCheck.AbstractCheck.__init__(self, "CheckCronJobs")
 
@@ -73,7 +76,7 @@ class CronCheck(AbstractCheck.AbstractCheck):
 
 
 # needs to be instantiated for the check to be registered with rpmlint
-check = CronCheck()
+check = HeaderFiles.register(CronCheck())
 
 for _id, desc in (
         (
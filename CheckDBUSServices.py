@@ -10,6 +10,8 @@
 
 from Filter import *
 import AbstractCheck
+import FileDispatcher
+import HeaderFiles
 import Whitelisting
 
 SERVICES_WHITELIST = Config.getOption('DBUSServices.WhiteList', ())  # set of file names
@@ -23,8 +25,11 @@ _dbus_system_paths = [
 
 
 class DBUSServiceCheck(AbstractCheck.AbstractCheck):
+    needs_payload = False
+
     def __init__(self):
         AbstractCheck.AbstractCheck.__init__(self, "CheckDBUSServices")
+        FileDispatcher.register("CheckDBUSServices", _dbus_system_paths)
 
     def check(self, pkg):
         global SERVICES_WHITELIST
@@ -33,13 +38,11 @@ class DBUSServiceCheck(AbstractCheck.AbstractCheck):
         if pkg.isSource():
             return
 
-        files = pkg.files()
-
-        for f in files:
+        for f in FileDispatcher.files(pkg, "CheckDBUSServices"):
             for p in _dbus_system_paths:
                 if f.startswith(p):
 
-                    if f in pkg.ghostFiles():
+                    if f in HeaderFiles.ghost_files(pkg):
                         printError(pkig, "suse-dbus-ghost-service", f)
                         continue
 
@@ -48,7 +51,7 @@ class DBUSServiceCheck(AbstractCheck.AbstractCheck):
                         printError(pkg, "suse-dbus-unauthorized-service", f)
 
 
-check = DBUSServiceCheck()
+check = HeaderFiles.register(DBUSServiceCheck())
 
 if Config.info:
     for _id, desc in (
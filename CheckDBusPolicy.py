@@ -6,62 +6,191 @@
 # Purpose       : Check for broken DBus policies
 #############################################################################
 
-# causes extraction of package if it contains files in /etc/dbus-1/system.d/
+# causes extraction of the files in /etc/dbus-1/system.d/
 
 from Filter import *
 import AbstractCheck
-from xml.dom.minidom import parse
+import HeaderFiles
+import PayloadAccess
+import atexit
+import sys
+from xml.etree.ElementTree import iterparse
+from xml.sax.saxutils import escape
+
+# when set, bus name ownership is collected over all checked packages and a
+# report about conflicting owners and dangling destinations is written to
+# this path at the end of the run
+BUS_NAME_REPORT = Config.getOption('DBusPolicy.BusNameReport', None)
+
+
+class PolicyRule(object):
+    """An <allow> or <deny> element found inside a <policy> block. Only the
+    tag and the attributes are kept."""
+
+    def __init__(self, tag, attrib):
+        self.tag = tag
+        self.attrib = attrib
+
+    def has(self, *names):
+        for name in names:
+            if name in self.attrib:
+                return True
+        return False
+
+    def toxml(self):
+        attrs = ''.join(' %s="%s"' % (k, escape(v, {'"': '&quot;'}))
+                        for k, v in self.attrib.items())
+        return '<%s%s/>' % (self.tag, attrs)
+
+
+def iter_policy_rules(source):
+    """Streams through the D-Bus configuration file @source, a path or an
+    open binary file, and yields a PolicyRule for every <allow> and <deny>
+    element that is nested in a <policy> element. Elements are discarded as
+    soon as they have been looked at so no document tree is built up."""
+
+    policy_depth = 0
+    for event, elem in iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if elem.tag == 'policy':
+                policy_depth += 1
+            continue
+
+        if elem.tag == 'policy':
+            policy_depth -= 1
+        elif policy_depth and elem.tag in ('allow', 'deny'):
+            yield PolicyRule(elem.tag, dict(elem.attrib))
+
+        elem.clear()
+
+
+class BusNameIndex(object):
+    """Run-wide index of D-Bus system bus names. It maps every bus name that
+    is granted via own= or own_prefix= to the packages granting it, and
+    every send_destination to the packages talking to it.
+
+    Only names are stored, and at most REFERRERS_KEPT package names per
+    destination, so the memory needed stays proportional to the number of
+    distinct bus names rather than to the number of packages checked."""
+
+    REFERRERS_KEPT = 3
+
+    # names that are owned by the bus daemon itself
+    BUILTIN_NAMES = ('org.freedesktop.DBus',)
+
+    def __init__(self):
+        # bus name -> set of package names
+        self.owners = {}
+        self.prefix_owners = {}
+        # bus name -> [number of referring packages, set of package names]
+        self.destinations = {}
+
+    def add_rule(self, pkgname, rule):
+        if rule.tag != 'allow':
+            return
+
+        pkgname = sys.intern(pkgname)
+
+        if 'own' in rule.attrib:
+            name = sys.intern(rule.attrib['own'])
+            self.owners.setdefault(name, set()).add(pkgname)
+        if 'own_prefix' in rule.attrib:
+            name = sys.intern(rule.attrib['own_prefix'])
+            self.prefix_owners.setdefault(name, set()).add(pkgname)
+        if 'send_destination' in rule.attrib:
+            name = sys.intern(rule.attrib['send_destination'])
+            entry = self.destinations.setdefault(name, [0, set()])
+            if pkgname not in entry[1]:
+                entry[0] += 1
+                if len(entry[1]) < self.REFERRERS_KEPT:
+                    entry[1].add(pkgname)
+
+    def is_owned(self, name):
+        if name in self.owners or name in self.BUILTIN_NAMES:
+            return True
+        prefix = name
+        while prefix:
+            if prefix in self.prefix_owners:
+                return True
+            prefix = prefix.rpartition('.')[0]
+        return False
+
+    def conflicts(self):
+        """Yields (bus name, packages) for names that are owned by more than
+        one package."""
+        for name in sorted(self.owners):
+            if len(self.owners[name]) > 1:
+                yield name, sorted(self.owners[name])
+
+    def dangling(self):
+        """Yields (bus name, number of packages, some packages) for
+        destinations that no checked package owns."""
+        for name in sorted(self.destinations):
+            if not self.is_owned(name):
+                count, pkgs = self.destinations[name]
+                yield name, count, sorted(pkgs)
+
+    def write_report(self, path):
+        with open(path, 'w') as out:
+            for name, pkgs in self.conflicts():
+                print("dbus-bus-name-conflict %s: %s" % (name, ' '.join(pkgs)),
+                      file=out)
+            for name, count, pkgs in self.dangling():
+                more = count - len(pkgs)
+                print("dbus-dangling-destination %s: %s%s" %
+                      (name, ' '.join(pkgs), more and " (+%d)" % more or ''),
+                      file=out)
 
 
 class DBusPolicyCheck(AbstractCheck.AbstractCheck):
+    needs_payload = True
+
     def __init__(self):
         AbstractCheck.AbstractCheck.__init__(self, "CheckDBusPolicy")
+        self.bus_names = None
+        if BUS_NAME_REPORT:
+            self.bus_names = BusNameIndex()
+            atexit.register(self.bus_names.write_report, BUS_NAME_REPORT)
+        PayloadAccess.register("CheckDBusPolicy", ("/etc/dbus-1/system.d/",))
 
     def check(self, pkg):
         if pkg.isSource():
             return
 
-        files = pkg.files()
-
-        for f in files:
-            if f in pkg.ghostFiles():
-                continue
-
+        for f in PayloadAccess.files(pkg, "CheckDBusPolicy"):
             # catch xml exceptions
             try:
-                if f.startswith("/etc/dbus-1/system.d/"):
-                    send_policy_seen = False
-                    lf = pkg.dirName() + f
-                    xml = parse(lf)
-                    for p in xml.getElementsByTagName("policy"):
-                        for allow in p.getElementsByTagName("allow"):
-                            if ((allow.hasAttribute('send_interface') or
-                                 allow.hasAttribute('send_member') or
-                                 allow.hasAttribute('send_path')) and not
-                                    allow.hasAttribute('send_destination')):
+                send_policy_seen = False
+                with PayloadAccess.open(pkg, f) as fd:
+                    for rule in iter_policy_rules(fd):
+                        if self.bus_names:
+                            self.bus_names.add_rule(pkg.name, rule)
+
+                        if rule.tag == 'allow':
+                            if (rule.has('send_interface', 'send_member', 'send_path') and not
+                                    rule.has('send_destination')):
                                 send_policy_seen = True
-                                printError(pkg, 'dbus-policy-allow-without-destination', "%(file)s: %(xml)s" % {'file': f, 'xml': allow.toxml()})
-                            elif allow.hasAttribute('send_destination'):
+                                printError(pkg, 'dbus-policy-allow-without-destination', f + ':', rule.toxml())
+                            elif rule.has('send_destination'):
                                 send_policy_seen = True
 
-                            if (allow.hasAttribute('receive_sender') or
-                                    allow.hasAttribute('receive_interface')):
-                                printInfo(pkg, 'dbus-policy-allow-receive', "%(file)s: %(xml)s" % {'file': f, 'xml': allow.toxml()})
+                            if rule.has('receive_sender', 'receive_interface'):
+                                printInfo(pkg, 'dbus-policy-allow-receive', f + ':', rule.toxml())
+                        elif (rule.has('send_interface') and not
+                                rule.has('send_destination')):
+                            printError(pkg, 'dbus-policy-deny-without-destination', f + ':', rule.toxml())
 
-                        for deny in p.getElementsByTagName("deny"):
-                            if (deny.hasAttribute('send_interface') and not
-                                    deny.hasAttribute('send_destination')):
-                                printError(pkg, 'dbus-policy-deny-without-destination', "%(file)s: %(xml)s" % {'file': f, 'xml': deny.toxml()})
-
-                    if not send_policy_seen:
-                        printError(pkg, 'dbus-policy-missing-allow', "%(file)s does not allow communication" % {'file': f})
+                if not send_policy_seen:
+                    printError(pkg, 'dbus-policy-missing-allow', "%(file)s does not allow communication" % {'file': f})
 
             except Exception as x:
                 printError(pkg, 'rpmlint-exception', "%(file)s raised an exception: %(x)s" % {'file': f, 'x': x})
                 continue
 
+        PayloadAccess.release(pkg, "CheckDBusPolicy")
+
 
-check = DBusPolicyCheck()
+check = HeaderFiles.register(DBusPolicyCheck())
 
 if Config.info:
     addDetails(
@@ -8,6 +8,7 @@
 
 import AbstractCheck
 import Filter
+import HeaderFiles
 import stat
 
 
@@ -25,6 +26,8 @@ def lang_ignore_pkg(name):
 
 
 class ExecDocsCheck(AbstractCheck.AbstractCheck):
+    needs_payload = False
+
     def __init__(self):
         self.map = []
         AbstractCheck.AbstractCheck.__init__(self, "CheckExecDocs")
@@ -34,7 +37,8 @@ class ExecDocsCheck(AbstractCheck.AbstractCheck):
         if pkg.isSource():
             return
 
-        files = pkg.files()
+        files = HeaderFiles.files(pkg)
+        doc_files = sorted(HeaderFiles.doc_files(pkg))
         complete_size = 0
         lang_size = 0
         for _, pkgfile in files.items():
@@ -44,7 +48,7 @@ class ExecDocsCheck(AbstractCheck.AbstractCheck):
                     lang_size += pkgfile.size
 
         doc_size = 0
-        for f in pkg.docFiles():
+        for f in doc_files:
             if stat.S_ISREG(files[f].mode):
                 doc_size += files[f].size
 
@@ -62,7 +66,7 @@ class ExecDocsCheck(AbstractCheck.AbstractCheck):
             Filter.printWarning(pkg, "package-with-huge-translation",
                                 ("%3d%%" % (lang_size * 100 / complete_size)))
 
-        for f in pkg.docFiles():
+        for f in doc_files:
             mode = files[f].mode
             if not stat.S_ISREG(mode) or not mode & 0o111:
                 continue
@@ -76,7 +80,7 @@ class ExecDocsCheck(AbstractCheck.AbstractCheck):
                     Filter.printError(pkg, 'executable-docs', f)
 
 
-check = ExecDocsCheck()
+check = HeaderFiles.register(ExecDocsCheck())
 
 Filter.addDetails(
 'executable-docs',
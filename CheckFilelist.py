@@ -7,6 +7,7 @@
 #############################################################################
 
 import AbstractCheck
+import HeaderFiles
 from Filter import addDetails, Config, printWarning, printError
 import fnmatch
 from rpm import RPMTAG_VENDOR
@@ -31,13 +32,13 @@ def isdebuginfo(pkg):
 
 
 def notsymlink(pkg, f):
-    mode = pkg.files()[f].mode
+    mode = HeaderFiles.files(pkg)[f].mode
     type = (mode >> 12) & 0o17
     return type != 0o12
 
 
 def ghostfile(pkg, f):
-    ghosts = pkg.ghostFiles()
+    ghosts = HeaderFiles.ghost_files(pkg)
     return f in ghosts
 
 
@@ -344,6 +345,8 @@ _checks = [
 
 
 class FilelistCheck(AbstractCheck.AbstractCheck):
+    needs_payload = False
+
     def __init__(self):
         AbstractCheck.AbstractCheck.__init__(self, "CheckFilelist")
         import re
@@ -378,7 +381,7 @@ class FilelistCheck(AbstractCheck.AbstractCheck):
         if pkg.isSource():
             return
 
-        files = pkg.files()
+        files = HeaderFiles.files(pkg)
 
         if not files:
             printWarning(pkg, 'suse-filelist-empty',
@@ -477,7 +480,7 @@ class FilelistCheck(AbstractCheck.AbstractCheck):
                        {'file': f})
 
 
-check = FilelistCheck()
+check = HeaderFiles.register(FilelistCheck())
 
 if Config.info:
     for check in _checks:
@@ -7,41 +7,61 @@
 #############################################################################
 
 import AbstractCheck
+import FileDispatcher
+import HeaderFiles
+import PayloadAccess
 from Filter import printError, addDetails
 import re
 
 
 class IconSizesCheck(AbstractCheck.AbstractCheck):
+    needs_payload = False
+
     def __init__(self):
         AbstractCheck.AbstractCheck.__init__(self, "CheckIconSizes")
         self.file_size_regex = re.compile(r'/icons/[^/]+/(\d+)x(\d+)/')
         self.info_size_regex = re.compile(r'(\d+) x (\d+)')
+        # the sizes of animations are not checked, don't even look at them
+        PayloadAccess.register_types(
+            "CheckIconSizes",
+            regex=r'\A(?!.*/animations/).*/icons/[^/]+/\d+x\d+/')
+
+    def actual_sizes(self, pkg, fname):
+        """Returns the tuple of the (width, height) of the images in
+        @fname, several for ICO files, None if unknown. For formats
+        FileSniffer does not know, and without the payload, the file class
+        recorded in the header is gone by."""
+
+        if not HeaderFiles.HEADER_ONLY:
+            sizes = PayloadAccess.file_type(pkg, fname).sizes
+            if sizes:
+                return sizes
+        pkgfile = HeaderFiles.files(pkg)[fname]
+        res = self.info_size_regex.search(pkgfile.magic)
+        return res and ((int(res.group(1)), int(res.group(2))),)
 
     def check(self, pkg):
 
         if pkg.isSource():
             return
 
-        for fname, pkgfile in pkg.files().items():
-
-            if '/animations/' in fname:
-                continue
-
+        for fname in FileDispatcher.files(pkg, "CheckIconSizes"):
             res = self.file_size_regex.search(fname)
-            if res:
-                sizes = (res.group(1), res.group(2))
-                res = self.info_size_regex.search(pkgfile.magic)
-                if res:
-                    actualsizes = (res.group(1), res.group(2))
-
-                    if abs(int(sizes[0]) - int(actualsizes[0])) > 2 or \
-                            abs(int(sizes[1]) - int(actualsizes[1])) > 2:
-                        printError(pkg, "wrong-icon-size", fname, "expected:",
-                                   "x".join(sizes),
-                                   "actual:", "x".join(actualsizes))
+            sizes = (res.group(1), res.group(2))
+            actual = self.actual_sizes(pkg, fname)
+            # an icon file holding several images only needs one image of
+            # the size of its directory
+            if actual and not any(
+                    abs(int(sizes[0]) - width) <= 2 and
+                    abs(int(sizes[1]) - height) <= 2
+                    for width, height in actual):
+                actualsizes = [str(n) for n in max(actual)]
+                printError(pkg, "wrong-icon-size", fname, "expected:",
+                           "x".join(sizes),
+                           "actual:", "x".join(actualsizes))
 
 
-check = IconSizesCheck()
+check = HeaderFiles.register(IconSizesCheck())
 
 addDetails(
 'wrong-icon-size',
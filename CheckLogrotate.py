@@ -8,33 +8,37 @@
 
 from Filter import printError, addDetails
 import AbstractCheck
+import HeaderFiles
 import os
+import PayloadAccess
 
 
 class LogrotateCheck(AbstractCheck.AbstractCheck):
+    needs_payload = True
+
     def __init__(self):
         AbstractCheck.AbstractCheck.__init__(self, "CheckLogrotate")
+        PayloadAccess.register("CheckLogrotate", ("/etc/logrotate.d/",))
 
     def check(self, pkg):
         if pkg.isSource():
             return
 
-        files = pkg.files()
+        files = HeaderFiles.files(pkg)
         dirs = {}
 
-        for f in files:
-            if f in pkg.ghostFiles():
-                continue
-
-            if f.startswith("/etc/logrotate.d/"):
-                try:
-                    for n, o in self.parselogrotateconf(pkg.dirName(), f).items():
-                        if n in dirs and dirs[n] != o:
-                            printError(pkg, "logrotate-duplicate", n)
-                        else:
-                            dirs[n] = o
-                except Exception as x:
-                    printError(pkg, 'rpmlint-exception', "%(file)s raised an exception: %(x)s" % {'file': f, 'x': x})
+        for f in PayloadAccess.files(pkg, "CheckLogrotate"):
+            try:
+                with PayloadAccess.open(pkg, f, 'r') as fd:
+                    entries = self.parselogrotateconf(fd)
+                for n, o in entries.items():
+                    if n in dirs and dirs[n] != o:
+                        printError(pkg, "logrotate-duplicate", n)
+                    else:
+                        dirs[n] = o
+            except Exception as x:
+                printError(pkg, 'rpmlint-exception', "%(file)s raised an exception: %(x)s" % {'file': f, 'x': x})
+        PayloadAccess.release(pkg, "CheckLogrotate")
 
         for d in sorted(dirs.keys()):
             if d not in files:
@@ -51,36 +55,35 @@ class LogrotateCheck(AbstractCheck.AbstractCheck):
                     pkg, 'suse-logrotate-user-writable-log-dir',
                     "%s %s:%s %04o" % (d, files[d].user, files[d].group, mode))
 
-    # extremely primitive logrotate parser
-    def parselogrotateconf(self, root, f):
+    # extremely primitive logrotate parser, reading the open file @fd
+    def parselogrotateconf(self, fd):
         dirs = {}
-        with open('/'.join((root, f))) as fd:
-            currentdirs = []
-            for line in fd.readlines():
-                line = line.strip()
-                if line.startswith('#'):
-                    continue
-                if not currentdirs:
-                    if line.endswith('{'):
-                        for logfile in line.split(' '):
-                            logfile = logfile.strip()
-                            if len(logfile) == 0 or logfile == '{':
-                                continue
-                            dn = os.path.dirname(logfile)
-                            if dn not in dirs:
-                                currentdirs.append(dn)
-                                dirs[dn] = None
-                else:
-                    if line.endswith('}'):
-                        currentdirs = []
-                    elif line.startswith("su "):
-                        a = line.split(" ")
-                        for dn in currentdirs:
-                            dirs[dn] = (a[1], a[2])
+        currentdirs = []
+        for line in fd.readlines():
+            line = line.strip()
+            if line.startswith('#'):
+                continue
+            if not currentdirs:
+                if line.endswith('{'):
+                    for logfile in line.split(' '):
+                        logfile = logfile.strip()
+                        if len(logfile) == 0 or logfile == '{':
+                            continue
+                        dn = os.path.dirname(logfile)
+                        if dn not in dirs:
+                            currentdirs.append(dn)
+                            dirs[dn] = None
+            else:
+                if line.endswith('}'):
+                    currentdirs = []
+                elif line.startswith("su "):
+                    a = line.split(" ")
+                    for dn in currentdirs:
+                        dirs[dn] = (a[1], a[2])
         return dirs
 
 
-check = LogrotateCheck()
+check = HeaderFiles.register(LogrotateCheck())
 
 addDetails(
 'suse-logrotate-duplicate',
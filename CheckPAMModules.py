@@ -8,17 +8,25 @@
 
 from Filter import *
 import AbstractCheck
+import FileDispatcher
+import HeaderFiles
 import re
 import Whitelisting
 
 PAM_WHITELIST = Config.getOption('PAMModules.WhiteList', ())  # set of file names
 
 pam_module_re = re.compile(r'^(?:/usr)?/lib(?:64)?/security/([^/]+\.so)$')
+pam_module_dirs = ('/lib/security/', '/lib64/security/',
+                   '/usr/lib/security/', '/usr/lib64/security/')
 
 
 class PAMModulesCheck(AbstractCheck.AbstractCheck):
+    needs_payload = False
+
     def __init__(self):
         AbstractCheck.AbstractCheck.__init__(self, "CheckPAMModules")
+        FileDispatcher.register("CheckPAMModules", pam_module_dirs,
+                                ('.so',), pam_module_re)
 
     def check(self, pkg):
         global PAM_WHITELIST
@@ -26,12 +34,10 @@ class PAMModulesCheck(AbstractCheck.AbstractCheck):
         if pkg.isSource():
             return
 
-        files = pkg.files()
-
-        for f in files:
+        for f in FileDispatcher.files(pkg, "CheckPAMModules"):
             m = pam_module_re.match(f)
             if m:
-                if f in pkg.ghostFiles():
+                if f in HeaderFiles.ghost_files(pkg):
                     printError(pkg, 'suse-pam-ghost-module', f)
                     continue
 
@@ -40,7 +46,7 @@ class PAMModulesCheck(AbstractCheck.AbstractCheck):
                     printError(pkg, "suse-pam-unauthorized-module", bn)
 
 
-check = PAMModulesCheck()
+check = HeaderFiles.register(PAMModulesCheck())
 
 if Config.info:
 
@@ -8,44 +8,71 @@
 
 import AbstractCheck
 import Config
+import ContentScanner
+import FileDispatcher
 import Filter
+import HeaderFiles
 import re
+import ResultCache
 import stat
 
 
-class PkgConfigCheck(AbstractCheck.AbstractFilesCheck):
+class PkgConfigCheck(AbstractCheck.AbstractCheck):
+    needs_payload = True
+
     def __init__(self):
-        AbstractCheck.AbstractFilesCheck.__init__(
-            self, "CheckPkgConfig", r'.*/pkgconfig/.*\.pc$')
+        AbstractCheck.AbstractCheck.__init__(self, "CheckPkgConfig")
         # currently causes too many failures (2008-03-05)
         self.suspicious_dir = re.compile(
             r'[=:](?:/usr/src/\w+/BUILD|/var/tmp|/tmp|/home)')
+        pc_files = r'.*/pkgconfig/.*\.pc$'
+        FileDispatcher.register('CheckPkgConfig', suffixes=('.pc',),
+                                regex=r'/pkgconfig/')
+        ContentScanner.register('CheckPkgConfig.suspicious_dir',
+                                self.suspicious_dir, pc_files)
+        # references to /lib when in lib64 mode and vice versa
+        ContentScanner.register('CheckPkgConfig.lib_dir',
+                                re.compile(r'^Libs:.*-L/usr/lib\\b'),
+                                pc_files, find_all=True)
+        ContentScanner.register('CheckPkgConfig.lib64_dir',
+                                re.compile(r'^Libs:.*-L/usr/lib64\\b'),
+                                pc_files, find_all=True)
+        self.cache = ResultCache.ResultCache('CheckPkgConfig', 1)
 
     def check(self, pkg):
         # check for references to /lib when in lib64 mode
         if pkg.arch in ('x86_64', 'ppc64', 's390x'):
-            self.wronglib_dir = re.compile(r'-L/usr/lib\\b')
+            self.wronglib_dir = 'CheckPkgConfig.lib_dir'
         else:
-            self.wronglib_dir = re.compile(r'-L/usr/lib64\\b')
+            self.wronglib_dir = 'CheckPkgConfig.lib64_dir'
 
-        AbstractCheck.AbstractFilesCheck.check(self, pkg)
+        ghost_files = HeaderFiles.ghost_files(pkg)
+        for filename in FileDispatcher.files(pkg, 'CheckPkgConfig'):
+            if filename not in ghost_files:
+                self.check_file(pkg, filename)
 
     def check_file(self, pkg, filename):
-        if pkg.isSource() or not stat.S_ISREG(pkg.files()[filename].mode):
+        pkgfile = HeaderFiles.files(pkg)[filename]
+        if pkg.isSource() or not stat.S_ISREG(pkgfile.mode):
             return
 
-        if pkg.grep(self.suspicious_dir, filename):
-            Filter.printError(pkg, "invalid-pkgconfig-file", filename)
+        findings = self.cache.get(
+            pkgfile, lambda: self.file_findings(pkg, filename),
+            (self.wronglib_dir,))
+        ResultCache.report(pkg, filename, findings)
+
+    def file_findings(self, pkg, filename):
+        findings = []
+        if ContentScanner.search(pkg, 'CheckPkgConfig.suspicious_dir',
+                                 filename):
+            findings.append(('E', "invalid-pkgconfig-file"))
 
-        pc_file = open(pkg.dirName() + "/" + filename, "r",
-                       encoding="utf-8", errors="ignore")
-        for l in pc_file:
-            if l.startswith('Libs:') and self.wronglib_dir.search(l):
-                Filter.printError(pkg, 'pkgconfig-invalid-libs-dir',
-                                  filename, l)
+        for hit in ContentScanner.search(pkg, self.wronglib_dir, filename):
+            findings.append(('E', 'pkgconfig-invalid-libs-dir', hit.line))
+        return findings
 
 
-check = PkgConfigCheck()
+check = HeaderFiles.register(PkgConfigCheck())
 
 if Config.info:
     Filter.addDetails(
@@ -9,8 +9,11 @@
 from Filter import *
 import AbstractCheck
 import Config
+import FileDispatcher
+import HeaderFiles
 import re
 import os
+import PayloadAccess
 import Whitelisting
 from xml.dom.minidom import parse
 
@@ -21,9 +24,15 @@ POLKIT_RULES_WHITELIST = Config.getOption('PolkitRulesWhitelist', ())
 
 
 class PolkitCheck(AbstractCheck.AbstractCheck):
+    needs_payload = True
+
     def __init__(self):
         AbstractCheck.AbstractCheck.__init__(self, "CheckPolkitPrivs")
         self.privs = {}
+        PayloadAccess.register("CheckPolkitPrivs.privs",
+                               ("/etc/polkit-default-privs.d/",))
+        PayloadAccess.register("CheckPolkitPrivs.actions",
+                               ("/usr/share/polkit-1/actions/",))
         self._collect_privs()
         self._collect_rules_whitelist()
 
@@ -38,14 +47,17 @@ class PolkitCheck(AbstractCheck.AbstractCheck):
 
     def _parse_privs_file(self, filename):
         with open(filename) as inputfile:
-            for line in inputfile:
-                line = line.split('#')[0].split('\n')[0]
-                if len(line):
-                    line = re.split(r'\s+', line)
-                    priv = line[0]
-                    value = line[1]
+            self._parse_privs(inputfile)
+
+    def _parse_privs(self, inputfile):
+        for line in inputfile:
+            line = line.split('#')[0].split('\n')[0]
+            if len(line):
+                line = re.split(r'\s+', line)
+                priv = line[0]
+                value = line[1]
 
-                    self.privs[priv] = value
+                self.privs[priv] = value
 
     def _collect_rules_whitelist(self):
         rules_entries = {}
@@ -71,60 +83,59 @@ class PolkitCheck(AbstractCheck.AbstractCheck):
     def check_perm_files(self, pkg):
         """Checks files in polkit-default-privs.d."""
 
-        files = pkg.files()
         prefix = "/etc/polkit-default-privs.d/"
         profiles = ("restrictive", "standard", "relaxed")
 
+        files = HeaderFiles.files(pkg)
+        ghost_files = HeaderFiles.ghost_files(pkg)
         permfiles = []
         # first pass, find additional files
-        for f in files:
-
-            if f.startswith(prefix):
+        for f in FileDispatcher.files(pkg, "CheckPolkitPrivs.privs"):
 
-                if f in pkg.ghostFiles():
-                    printError(pkg, 'polkit-ghost-file', f)
-                    continue
+            if f in ghost_files:
+                printError(pkg, 'polkit-ghost-file', f)
+                continue
 
-                bn = f[len(prefix):]
-                if bn not in POLKIT_PRIVS_WHITELIST:
-                    printError(pkg, "polkit-unauthorized-file", f)
+            bn = f[len(prefix):]
+            if bn not in POLKIT_PRIVS_WHITELIST:
+                printError(pkg, "polkit-unauthorized-file", f)
 
-                parts = bn.rsplit('.', 1)
+            parts = bn.rsplit('.', 1)
 
-                if len(parts) == 2 and parts[-1] in profiles:
-                    bn = parts[0]
+            if len(parts) == 2 and parts[-1] in profiles:
+                bn = parts[0]
 
-                if bn not in permfiles:
-                    permfiles.append(bn)
+            if bn not in permfiles:
+                permfiles.append(bn)
 
         for f in sorted(permfiles):
-            f = pkg.dirName() + prefix + f
+            f = prefix + f
 
             for profile in profiles:
                 path = '.'.join((f, profile))
-                if os.path.exists(path):
-                    self._parse_privs_file(path)
+                if path in files and path not in ghost_files:
                     break
             else:
-                self._parse_privs_file(f)
+                path = f
+
+            with PayloadAccess.open(pkg, path, 'r') as inputfile:
+                self._parse_privs(inputfile)
 
     def check_actions(self, pkg):
         """Checks files in the actions directory."""
 
-        files = pkg.files()
-        prefix = "/usr/share/polkit-1/actions/"
-
-        for f in files:
+        ghost_files = HeaderFiles.ghost_files(pkg)
+        for f in FileDispatcher.files(pkg, "CheckPolkitPrivs.actions"):
             # catch xml exceptions
             try:
-                if f.startswith(prefix):
-                    if f in pkg.ghostFiles():
-                        printError(pkg, 'polkit-ghost-file', f)
-                        continue
-
-                    xml = parse(pkg.dirName() + f)
-                    for a in xml.getElementsByTagName("action"):
-                        self.check_action(pkg, a)
+                if f in ghost_files:
+                    printError(pkg, 'polkit-ghost-file', f)
+                    continue
+
+                with PayloadAccess.open(pkg, f) as fd:
+                    xml = parse(fd)
+                for a in xml.getElementsByTagName("action"):
+                    self.check_action(pkg, a)
             except Exception as x:
                 printError(pkg, 'rpmlint-exception', "%(file)s raised an exception: %(x)s" % {'file': f, 'x': x})
                 continue
@@ -192,9 +203,11 @@ class PolkitCheck(AbstractCheck.AbstractCheck):
         self.check_perm_files(pkg)
         self.check_actions(pkg)
         self.check_rules(pkg)
+        PayloadAccess.release(pkg, "CheckPolkitPrivs.privs")
+        PayloadAccess.release(pkg, "CheckPolkitPrivs.actions")
 
 
-check = PolkitCheck()
+check = HeaderFiles.register(PolkitCheck())
 
 for _id, desc in (
         (
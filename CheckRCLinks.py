@@ -11,11 +11,18 @@ import stat
 from Filter import *
 import AbstractCheck
 import Config
+import FileDispatcher
+import HeaderFiles
 
 
 class RCLinksCheck(AbstractCheck.AbstractCheck):
+    needs_payload = False
+
     def __init__(self):
         AbstractCheck.AbstractCheck.__init__(self, 'CheckRCLinks')
+        FileDispatcher.register('CheckRCLinks', ('/usr/sbin/rc', '/sbin/rc',
+                                                 '/usr/lib/systemd/system/',
+                                                 '/etc/init.d/'))
 
     def check(self, pkg):
         if pkg.isSource():
@@ -25,8 +32,11 @@ class RCLinksCheck(AbstractCheck.AbstractCheck):
         rccandidates = set()
         initscripts = set()
 
-        for fname, pkgfile in pkg.files().items():
-            if fname in pkg.ghostFiles():
+        files = HeaderFiles.files(pkg)
+        ghost_files = HeaderFiles.ghost_files(pkg)
+        for fname in FileDispatcher.files(pkg, 'CheckRCLinks'):
+            pkgfile = files[fname]
+            if fname in ghost_files:
                 continue
 
             if (stat.S_ISLNK(pkgfile.mode) and
@@ -56,7 +66,7 @@ class RCLinksCheck(AbstractCheck.AbstractCheck):
                 printWarning(pkg, "suse-missing-rclink", fname)
 
 
-check = RCLinksCheck()
+check = HeaderFiles.register(RCLinksCheck())
 if Config.info:
     addDetails(
 'suse-missing-rclink',
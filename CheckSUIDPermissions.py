@@ -10,10 +10,14 @@ from __future__ import print_function
 
 from Filter import printWarning, printError, printInfo, addDetails
 import AbstractCheck
+import DependencyIndex
+import FileDispatcher
+import HeaderFiles
+import PayloadAccess
+import Scriptlets
 import Whitelisting
 import os
 import re
-import rpm
 import sys
 import stat
 
@@ -29,9 +33,18 @@ _permissions_d_whitelist = (
 
 
 class SUIDCheck(AbstractCheck.AbstractCheck):
+    needs_payload = True
+
     def __init__(self):
         AbstractCheck.AbstractCheck.__init__(self, "CheckSUIDPermissions")
         self.perms = {}
+        PayloadAccess.register("CheckSUIDPermissions",
+                               tuple(self._paths_to("permissions.d/")))
+        # setuid and permissions listed executables are checked for PIE
+        PayloadAccess.register_types("CheckSUIDPermissions.executables",
+                                     select=self._executable)
+        # ELF type by file digest
+        self.m_elf_types = {}
 
         for fname in self._paths_to('permissions', 'permissions.secure'):
             if os.path.exists(fname):
@@ -49,10 +62,40 @@ class SUIDCheck(AbstractCheck.AbstractCheck):
             yield '/usr/share/permissions/' + name
             yield '/etc/' + name
 
-    def _parsefile(self, fname):
+    def _executable(self, pkg, pkgfile):
+        """Returns whether the type of the file described by @pkgfile
+        might be checked."""
+
+        mode = pkgfile.mode
+        if not stat.S_ISREG(mode):
+            return False
+        if mode & (stat.S_ISUID | stat.S_ISGID):
+            return True
+        # the permissions.d files of the package itself are only parsed
+        # once its files are read
+        return bool(mode & (stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)) and \
+            (pkgfile.name in self.perms or
+             bool(FileDispatcher.files(pkg, "CheckSUIDPermissions")))
+
+    def elf_type(self, pkg, fname):
+        """Returns the type of the ELF file @fname as described by file(1),
+        None if it is not an ELF file. It is taken from e_type and DT_FLAGS_1
+        in the dynamic segment, the rest of the file is not read."""
+
+        digest = HeaderFiles.files(pkg)[fname].md5
+        if digest and digest in self.m_elf_types:
+            return self.m_elf_types[digest]
+
+        ret = PayloadAccess.file_type(pkg, fname).elf_type
+
+        if digest:
+            self.m_elf_types[digest] = ret
+        return ret
+
+    def _parsefile(self, fname, opener=open):
         lnr = 0
         lastfn = None
-        with open(fname) as inputfile:
+        with opener(fname) as inputfile:
             for line in inputfile:
                 lnr += 1
                 line = line.split('#')[0].split('\n')[0]
@@ -88,15 +131,16 @@ class SUIDCheck(AbstractCheck.AbstractCheck):
         if pkg.isSource():
             return
 
-        files = pkg.files()
+        files = HeaderFiles.files(pkg)
+        ghost_files = HeaderFiles.ghost_files(pkg)
 
         permfiles = set()
         # first pass, find and parse permissions.d files
-        for f in files:
+        for f in FileDispatcher.files(pkg, "CheckSUIDPermissions"):
             for prefix in self._paths_to("permissions.d/"):
                 if f.startswith(prefix):
 
-                    if f in pkg.ghostFiles():
+                    if f in ghost_files:
                         printError(pkg, 'polkit-ghost-file', f)
                         continue
 
@@ -112,8 +156,17 @@ class SUIDCheck(AbstractCheck.AbstractCheck):
             # check for a .secure file first, falling back to the plain file
             for path in self._paths_to(f + '.secure', f):
                 if path in files:
-                    self._parsefile(pkg.dirName() + path)
+                    self._parsefile(
+                        path, lambda f: PayloadAccess.open(pkg, f, 'r'))
                     break
+        PayloadAccess.release(pkg, "CheckSUIDPermissions")
+
+        scriptlets = Scriptlets.get(pkg)
+        postin = scriptlets['post']
+        set_permissions = scriptlets.chkstat_paths('post', '-n')
+        verify_permissions = scriptlets.chkstat_paths('verify')
+        suseconfig = ("SuSEconfig --module permissions" in postin.text or
+                      "run_permissions is obsolete" in postin.text)
 
         need_set_permissions = False
         found_suseconfig = False
@@ -145,10 +198,9 @@ class SUIDCheck(AbstractCheck.AbstractCheck):
                         f += '/'
 
                 if stat.S_ISREG(mode) and mode & (stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH):
-                    # pie binaries have 'shared object' here
-                    if (pkgfile.magic.startswith('ELF ') and
-                            ('shared object' not in pkgfile.magic) and
-                            ('pie executable' not in pkgfile.magic)):
+                    elf_type = self.elf_type(pkg, f)
+                    if elf_type is not None and \
+                            elf_type not in ('shared object', 'pie executable'):
                         printError(pkg, 'non-position-independent-executable',
                                    f)
 
@@ -185,8 +237,8 @@ class SUIDCheck(AbstractCheck.AbstractCheck):
                         printWarning(pkg, 'permissions-directory-setuid-bit', msg)
 
                     if stat.S_ISREG(mode):
-                        if ('shared object' not in pkgfile.magic and
-                                'pie executable' not in pkgfile.magic):
+                        if self.elf_type(pkg, f) not in ('shared object',
+                                                         'pie executable'):
                             printError(pkg, 'non-position-independent-executable', f)
 
                 if mode & stat.S_IWOTH:
@@ -195,43 +247,27 @@ class SUIDCheck(AbstractCheck.AbstractCheck):
                                '%(file)s is packaged with world writable permissions (0%(mode)o)' %
                                {'file': f, 'mode': mode})
 
-            script = pkg[rpm.RPMTAG_POSTIN] or pkg.scriptprog(rpm.RPMTAG_POSTINPROG)
-            found = False
-            if script:
-                for line in script.split("\n"):
-                    if "chkstat -n" in line and f in line:
-                        found = True
-                        break
-
-                    if "SuSEconfig --module permissions" in line \
-                            or "run_permissions is obsolete" in line:
-                        found = True
-                        found_suseconfig = True
-                        break
+            path = f.rstrip('/') or '/'
+            found = path in set_permissions
+            if suseconfig:
+                found = True
+                found_suseconfig = True
 
             if need_verifyscript and \
                     (f not in self.perms or 'static' not in self.perms[f]):
 
-                if not script or not found:
+                if not found:
                     printError(pkg, 'permissions-missing-postin',
                                "missing %%set_permissions %s in %%post" % f)
 
                 need_set_permissions = True
-                script = pkg[rpm.RPMTAG_VERIFYSCRIPT] or pkg[rpm.RPMTAG_VERIFYSCRIPTPROG]
-
-                found = False
-                if script:
-                    for line in script.split("\n"):
-                        if "/chkstat" in line and f in line:
-                            found = True
-                            break
 
-                if not script or not found:
+                if path not in verify_permissions:
                     printWarning(pkg, 'permissions-missing-verifyscript',
                                  "missing %%verify_permissions -e %s" % f)
 
         if need_set_permissions:
-            if 'permissions' not in map(lambda x: x[0], pkg.prereq()):
+            if 'permissions' not in DependencyIndex.get(pkg).prereq:
                 printError(pkg, 'permissions-missing-requires',
                            "missing 'permissions' in PreReq")
 
@@ -240,7 +276,7 @@ class SUIDCheck(AbstractCheck.AbstractCheck):
                       "%run_permissions is obsolete")
 
 
-check = SUIDCheck()
+check = HeaderFiles.register(SUIDCheck())
 
 for _id, desc in (
         (
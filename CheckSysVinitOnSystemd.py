@@ -11,6 +11,9 @@ import os
 from Filter import addDetails, printError
 import AbstractCheck
 import Config
+import DependencyIndex
+import FileDispatcher
+import HeaderFiles
 
 insserv_tag = 'suse-obsolete-insserv-requirement'
 etcinit_tag = 'suse-deprecated-init-script'
@@ -18,28 +21,28 @@ bootscr_tag = 'suse-deprecated-boot-script'
 
 
 class CheckSysVinitOnSystemd(AbstractCheck.AbstractFilesCheck):
+    needs_payload = False
+
     def __init__(self):
         self.map = []
         AbstractCheck.AbstractCheck.__init__(self, 'CheckSysVinitOnSystemd')
+        FileDispatcher.register('CheckSysVinitOnSystemd', ('/etc/init.d',))
 
     def check(self, pkg):
         if pkg.isSource():
             return
 
-        for req in pkg.requires() + pkg.prereq():
-            if req[0] == 'insserv':
-                printError(pkg, insserv_tag)
+        if 'insserv' in DependencyIndex.get(pkg).all_requires:
+            printError(pkg, insserv_tag)
 
-        for fn in pkg.files():
-            if not fn.startswith('/etc/init.d'):
-                continue
+        for fn in FileDispatcher.files(pkg, 'CheckSysVinitOnSystemd'):
             if os.path.basename(fn).startswith('boot.'):
                 printError(pkg, bootscr_tag, fn)
             else:
                 printError(pkg, etcinit_tag, fn)
 
 
-check = CheckSysVinitOnSystemd()
+check = HeaderFiles.register(CheckSysVinitOnSystemd())
 
 if Config.info:
     addDetails(
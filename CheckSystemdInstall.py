@@ -8,8 +8,9 @@
 
 import os
 import re
-import rpm
 import AbstractCheck
+import HeaderFiles
+import Scriptlets
 from Filter import addDetails, printWarning
 
 # check only for files copied to this directory
@@ -18,9 +19,14 @@ SYSTEMD_SERVICE_DIRECTORY = "/usr/lib/systemd/system"
 CHECKED_UNITS = ['service', 'socket', 'target']
 CHECKED_UNITS_REGEXP = re.compile("^" + SYSTEMD_SERVICE_DIRECTORY + r'.+\.(' + '|'.join(CHECKED_UNITS) + ')$')
 
+# scriptlet macros every unit has to be handled by
+MACROS = ('service_add_pre', 'service_add_post', 'service_del_preun', 'service_del_postun')
+
 
 class CheckSystemdInstall(AbstractCheck.AbstractCheck):
 
+    needs_payload = False
+
     def __init__(self):
         AbstractCheck.AbstractCheck.__init__(self, 'CheckSystemdInstall')
 
@@ -29,51 +35,19 @@ class CheckSystemdInstall(AbstractCheck.AbstractCheck):
         if pkg.isSource():
             return
 
-        pre = pkg[rpm.RPMTAG_PREIN] or pkg.scriptprog(rpm.RPMTAG_PREINPROG)
-        post = pkg[rpm.RPMTAG_POSTIN] or pkg.scriptprog(rpm.RPMTAG_POSTINPROG)
-
-        preun = pkg[rpm.RPMTAG_PREUN] or pkg.scriptprog(rpm.RPMTAG_PREUNPROG)
-        postun = pkg[rpm.RPMTAG_POSTUN] or pkg.scriptprog(rpm.RPMTAG_POSTUNPROG)
+        scriptlets = Scriptlets.get(pkg)
 
-        for fname in pkg.files():
+        for fname in HeaderFiles.files(pkg):
 
             if CHECKED_UNITS_REGEXP.search(fname):
-                processed = {'pre': False, 'post': False, 'preun': False, 'postun': False}
-
-                escaped_basename = re.escape(os.path.basename(fname))
-                PRE_POST_PATTERN = re.compile(r'for service in .*' + escaped_basename)
-                PREUN_PATTERN = re.compile(r'systemctl --no-reload disable .*' + escaped_basename)
-                POSTUN_PATTERN = re.compile(r'(systemctl try-restart .*|# Restart of .*)' + escaped_basename)
-
-                for line in pre.split("\n"):
-                    if PRE_POST_PATTERN.search(line):
-                        processed['pre'] = True
-                        break
-                for line in post.split("\n"):
-                    if PRE_POST_PATTERN.search(line):
-                        processed['post'] = True
-                        break
-                for line in preun.split("\n"):
-                    if PREUN_PATTERN.search(line):
-                        processed['preun'] = True
-                        break
-                for line in postun.split("\n"):
-                    if POSTUN_PATTERN.search(line):
-                        processed['postun'] = True
-                        break
-
-                if not processed['pre']:
-                    printWarning(pkg, 'systemd-service-without-service_add_pre', os.path.basename(fname))
-                if not processed['post']:
-                    printWarning(pkg, 'systemd-service-without-service_add_post', os.path.basename(fname))
-                if not processed['preun']:
-                    printWarning(pkg, 'systemd-service-without-service_del_preun', os.path.basename(fname))
-                if not processed['postun']:
-                    printWarning(pkg, 'systemd-service-without-service_del_postun', os.path.basename(fname))
+                basename = os.path.basename(fname)
+                for macro in MACROS:
+                    if basename not in scriptlets.service_units(macro):
+                        printWarning(pkg, 'systemd-service-without-' + macro, basename)
 
 
 # Create an object to enable the auto registration of the test
-check = CheckSystemdInstall()
+check = HeaderFiles.register(CheckSystemdInstall())
 
 addDetails(
 'systemd-service-without-service_add_pre',
@@ -0,0 +1,171 @@
+# vim:sw=4:et
+#############################################################################
+# File          : CheckUnusedLibs.py
+# Package       : rpmlint
+# Author        : Dirk Mueller
+# Purpose       : Check for binaries linking unused libraries
+#############################################################################
+
+# A needed library is unused if none of the undefined dynamic symbols of a
+# binary would be bound to it. Like ld.so, each symbol is bound to the first
+# of the needed libraries exporting it. Libraries are looked up in the
+# package first and on the system otherwise; needed libraries that cannot be
+# found are never reported.
+
+import collections
+import os
+import re
+import stat
+
+import AbstractCheck
+import Config
+import ElfFile
+import FileSniffer
+import HeaderFiles
+import PayloadAccess
+from Filter import printError, addDetails
+
+# directories searched for needed libraries the package does not ship
+LIBRARY_PATH = Config.getOption('CheckUnusedLibs.LibraryPath', (
+    '/lib64', '/usr/lib64', '/lib', '/usr/lib'))
+
+IGNORED_LIBS = ('libdl.so.2', 'libm.so.6', 'libpthread.so.0')
+
+# the dynamic linker is loaded anyway
+DYNAMIC_LINKER = re.compile(r'ld[-\w]*\.so(\.\d+)*$')
+
+ElfInfo = collections.namedtuple(
+    'ElfInfo', ('elfclass', 'machine', 'needed', 'undefined', 'defined'))
+
+# ElfInfo of the system libraries by path, kept for the whole run
+_system_libs = {}
+
+
+def elf_info(fd):
+    """Returns the ElfInfo of the ELF file open as @fd, None if it is not
+    one or cannot be read."""
+
+    try:
+        view = ElfFile.FileView(fd)
+        if not ElfFile.is_elf(view[:4]):
+            return None
+        elf = ElfFile.ElfFile(view)
+        return ElfInfo(elf.elfclass, elf.e_machine, elf.needed(),
+                       elf.undefined_symbols(), elf.defined_symbols())
+    except (IOError, OSError, ElfFile.ElfError, IndexError):
+        return None
+
+
+def system_elf_info(path):
+    """Returns the ElfInfo of the system library at @path, None if there is
+    none."""
+
+    if path not in _system_libs:
+        try:
+            with open(path, 'rb') as fd:
+                _system_libs[path] = elf_info(fd)
+        except (IOError, OSError):
+            _system_libs[path] = None
+    return _system_libs[path]
+
+
+class UnusedLibsCheck(AbstractCheck.AbstractCheck):
+    needs_payload = True
+
+    def __init__(self):
+        AbstractCheck.AbstractCheck.__init__(self, "CheckUnusedLibs")
+        PayloadAccess.register("CheckUnusedLibs",
+                               regex=r'\A(?!/usr/lib/debug)',
+                               file_type=FileSniffer.is_elf)
+
+    def check(self, pkg):
+
+        if pkg.isSource():
+            return
+
+        files = HeaderFiles.files(pkg)
+        binaries = [fname for fname in PayloadAccess.files(pkg,
+                                                           "CheckUnusedLibs")
+                    if stat.S_ISREG(files[fname].mode)]
+
+        # names of the ELF files shipped in the package by their base name,
+        # symbolic links resolved. They are only read once a binary needs a
+        # library of that name.
+        self.pkg_paths = collections.defaultdict(list)
+        self.pkg_libs = {}
+        for fname, pkgfile in files.items():
+            if pkgfile.is_ghost:
+                continue
+            target = HeaderFiles.readlink(pkg, pkgfile)
+            if target is not None and target.name in binaries:
+                self.pkg_paths[os.path.basename(fname)].append(target.name)
+
+        for fname in binaries:
+
+            info = self.pkg_elf_info(pkg, fname)
+            if not info or not info.needed:
+                continue
+
+            for lib in self.unused_libs(pkg, info):
+                if lib in IGNORED_LIBS or DYNAMIC_LINKER.match(lib):
+                    continue
+                printError(pkg, 'elf-binary-unused-dependency', fname, lib)
+
+        PayloadAccess.release(pkg, "CheckUnusedLibs")
+
+    def pkg_elf_info(self, pkg, fname):
+        """Returns the ElfInfo of the file @fname of @pkg, which is read at
+        most once."""
+
+        if fname not in self.pkg_libs:
+            try:
+                with PayloadAccess.open(pkg, fname) as fd:
+                    self.pkg_libs[fname] = elf_info(fd)
+            except (IOError, OSError):
+                self.pkg_libs[fname] = None
+        return self.pkg_libs[fname]
+
+    def find_library(self, pkg, soname, binary):
+        """Returns the ElfInfo of the library @soname as the ELF @binary
+        of @pkg would load it, None if it cannot be found."""
+
+        for fname in self.pkg_paths.get(soname, ()):
+            lib = self.pkg_elf_info(pkg, fname)
+            if lib and (lib.elfclass, lib.machine) == (binary.elfclass,
+                                                       binary.machine):
+                return lib
+
+        for directory in LIBRARY_PATH:
+            lib = system_elf_info(os.path.join(directory, soname))
+            if lib and (lib.elfclass, lib.machine) == (binary.elfclass,
+                                                       binary.machine):
+                return lib
+
+        return None
+
+    def unused_libs(self, pkg, info):
+        """Returns the needed libraries of the ELF file of @pkg described by
+        @info that none of its symbol lookups would be bound to."""
+
+        needed = [(soname, self.find_library(pkg, soname, info))
+                  for soname in info.needed]
+        # symbols defined by the binary itself are looked up as well, they
+        # might be copy relocated from a library
+        used = set()
+        for symbol in info.undefined | info.defined:
+            for soname, lib in needed:
+                if lib and symbol in lib.defined:
+                    used.add(soname)
+                    break
+
+        return [soname for soname, lib in needed
+                if lib and soname not in used]
+
+
+check = HeaderFiles.register(UnusedLibsCheck())
+
+if Config.info:
+    addDetails(
+'elf-binary-unused-dependency',
+"Your ELF binary links a library that is not used."
+)
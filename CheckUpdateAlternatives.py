@@ -7,10 +7,10 @@
 from Filter import printWarning, addDetails, Config
 
 import AbstractCheck
+import HeaderFiles
 import os
-import rpm
+import Scriptlets
 import stat
-import Pkg
 
 
 class CheckUpdateAlternatives(AbstractCheck.AbstractCheck):
@@ -22,59 +22,20 @@ class CheckUpdateAlternatives(AbstractCheck.AbstractCheck):
 
     """
 
-    INSTALL = "--install"
+    needs_payload = False
 
     def __init__(self):
         AbstractCheck.AbstractCheck.__init__(self, "CheckUpdateAlternatives")
 
-    @classmethod
-    def read_ghost_files(cls, script):
-
-        if not script or 'update-alternatives' not in script:
-            return set()
-
-        ghost_files = set()
-
-        for command in (
-                c.replace('\\\n', '').replace('"', '').strip()
-                for c in script.split('update-alternatives')
-                if cls.INSTALL in c):
-
-            # parse install
-            command_args = []
-            for arg in command.split(None):
-                if not arg.startswith("--"):
-                    command_args.append(arg)
-
-            ghost_files.add(command_args[0])
-
-            SLAVE = "--slave"
-
-            if SLAVE in command:
-                for sc in (
-                        c.strip()
-                        for c in command[command.index(SLAVE):].split(SLAVE)
-                        if c.strip() != ''):
-
-                    xs = sc.split(None, 2)
-                    ghost_files.add(xs[0])
-
-        return ghost_files
-
     def check(self, pkg):
 
         if pkg.isSource():
             return
 
-        alt_files = set()
-        for script in (pkg.header[tag]
-                       for tag in (rpm.RPMTAG_POSTIN,
-                                   rpm.RPMTAG_PREIN,
-                                   rpm.RPMTAG_POSTTRANS)):
-            alt_files.update(self.read_ghost_files(Pkg.b2s(script)))
+        alt_files = Scriptlets.get(pkg).alternatives()
 
-        files = pkg.files()
-        ghost_files = pkg.ghostFiles()
+        files = HeaderFiles.files(pkg)
+        ghost_files = HeaderFiles.ghost_files(pkg)
 
         for af in alt_files:
             # /etc/alternatives/$(basename) should be a ghost file
@@ -99,7 +60,7 @@ class CheckUpdateAlternatives(AbstractCheck.AbstractCheck):
             # TODO check that %preun contains --remove call
 
 
-check = CheckUpdateAlternatives()
+check = HeaderFiles.register(CheckUpdateAlternatives())
 
 if Config.info:
     addDetails(
@@ -0,0 +1,444 @@
+# vim: sw=4 ts=4 sts=4 et :
+#############################################################################
+# Purpose       : single-read content scanning shared by content checks
+#############################################################################
+
+# Several checks search the content of (nearly) every file of a package for
+# some regular expression. Instead of every check calling pkg.grep() on its
+# own, checks register their patterns once at construction time. The first
+# time any check asks about a file, the file is read once and all patterns
+# registered for it are evaluated against the buffer. The results are kept
+# for the package so that the other checks get their answer without
+# touching the file again.
+#
+# Large files are read in fixed-size chunks so that memory usage does not
+# depend on the file size, and reading stops as soon as every pattern that
+# only needs a single hit has one.
+
+import collections
+import re
+import stat
+import weakref
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+import Config
+import ElfFile
+from Filter import printWarning
+import HeaderFiles
+import PayloadAccess
+
+# files larger than this are scanned chunk by chunk
+CHUNK_SIZE = 1024 * 1024
+
+# lines are kept together across chunk boundaries up to this length. Longer
+# lines, like in binary data without any newlines, are split with an overlap
+# of the longest possible match of the patterns, capped to this length.
+LINE_LIMIT = 64 * 1024
+
+# scan at most this many bytes of each file, 0 for no limit
+MAX_FILE_BYTES = Config.getOption('ContentScanner.MaxFileBytes', 0)
+
+# shorter literals are not selective enough to be worth a prefilter pass
+MIN_LITERAL_LENGTH = 3
+
+# a single match of a registered pattern: the file offset of the match, the
+# text of the line containing it and the matched text itself
+Hit = collections.namedtuple('Hit', ('offset', 'line', 'match'))
+
+
+class Pattern(object):
+    """A content pattern registered by a check."""
+
+    def __init__(self, key, regex, path_regex, find_all, only_if,
+                 elf_sections):
+        self.key = key
+        self.regex = regex
+        # matching happens on the raw file content, line semantics of the
+        # original pattern are kept by verifying each candidate against the
+        # line it starts in
+        self.bregex = re.compile(regex.pattern.encode('utf-8'),
+                                 (regex.flags & ~re.UNICODE) | re.MULTILINE)
+        self.path_re = re.compile(path_regex) if path_regex else None
+        self.find_all = find_all
+        self.only_if = only_if
+        self.elf_sections = elf_sections
+        # every match contains at least one of these, see required_literals()
+        self.literals = required_literals(regex)
+        self.width = min(max_width(regex), LINE_LIMIT)
+
+    def wants(self, filename):
+        return not self.path_re or self.path_re.match(filename)
+
+    def candidates(self, buf, pos, end):
+        """Yields offsets between @pos and @end in @buf where a match may
+        start a line search. Without literals these come from the regular
+        expression itself, otherwise only the literals are looked up and
+        the regular expression never runs on lines not containing any."""
+
+        if not self.literals:
+            while True:
+                m = self.bregex.search(buf, pos, end)
+                if not m:
+                    return
+                pos = yield m.start()
+            return
+
+        # next occurrence of each literal, refreshed once passed
+        found = {lit: buf.find(lit, pos, end) for lit in self.literals}
+        while True:
+            for lit, off in found.items():
+                if 0 <= off < pos:
+                    found[lit] = buf.find(lit, pos, end)
+            offsets = [off for off in found.values() if off >= 0]
+            if not offsets:
+                return
+            pos = yield min(offsets)
+
+    def scan(self, buf, regions):
+        """Returns a list of Hit objects for the (start, end) @regions of
+        @buf. Each region is treated like a file of its own. Unless
+        @find_all was requested only the first hit is returned."""
+
+        hits = []
+        for start, end in regions:
+            hits.extend(self._scan_region(buf, start, end))
+            if hits and not self.find_all:
+                break
+        return hits
+
+    def _scan_region(self, buf, region_start, end):
+        hits = []
+        candidates = self.candidates(buf, region_start, end)
+        try:
+            start = next(candidates)
+        except StopIteration:
+            return hits
+
+        while True:
+            line_start = buf.rfind(b'\n', region_start, start) + 1
+            if not line_start:
+                line_start = region_start
+            line_end = buf.find(b'\n', start, end)
+            if line_end < 0:
+                line_end = end
+
+            m = self.bregex.search(buf, line_start, line_end)
+            if m:
+                text_end = min(line_end, line_start + LINE_LIMIT)
+                hits.append(Hit(m.start(),
+                                _decode(buf[line_start:text_end]),
+                                _decode(m.group(0))))
+                if not self.find_all:
+                    break
+            if line_end >= end:
+                break
+            try:
+                start = candidates.send(line_end + 1)
+            except StopIteration:
+                break
+
+        return hits
+
+
+def max_width(regex):
+    """Returns the maximum length of a match of the compiled @regex, which
+    can be huge for unbounded repetitions."""
+
+    try:
+        return sre_parse.parse(regex.pattern, regex.flags).getwidth()[1]
+    except Exception:
+        return LINE_LIMIT
+
+
+def required_literals(regex):
+    """Returns a tuple of byte strings of which at least one occurs in every
+    line matched by the compiled @regex, or None if no such literals of a
+    useful length can be determined."""
+
+    if regex.flags & re.IGNORECASE:
+        return None
+
+    try:
+        parsed = sre_parse.parse(regex.pattern, regex.flags)
+    except Exception:
+        return None
+
+    literals = _sequence_literals(list(parsed))
+    if not literals or min(len(lit) for lit in literals) < MIN_LITERAL_LENGTH:
+        return None
+    return tuple(lit.encode('utf-8') for lit in literals)
+
+
+def _sequence_literals(items):
+    """All items of a sequence have to match, so the most selective set of
+    literals any of them requires is the one of the whole sequence."""
+
+    options = []
+    run = []
+    for op, av in items:
+        if op == sre_parse.LITERAL and av != ord('\n'):
+            run.append(chr(av))
+            continue
+        if run:
+            options.append({''.join(run)})
+            run = []
+
+        if op == sre_parse.SUBPATTERN:
+            # the literals of a (?i:...) group might match in any case
+            if av[1] & re.IGNORECASE:
+                sub = None
+            else:
+                sub = _sequence_literals(list(av[-1]))
+        elif op == sre_parse.BRANCH:
+            sub = _branch_literals(av[1])
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] > 0:
+            sub = _sequence_literals(list(av[2]))
+        else:
+            sub = None
+        if sub:
+            options.append(sub)
+    if run:
+        options.append({''.join(run)})
+
+    if not options:
+        return None
+    return max(options, key=lambda lits: min(len(lit) for lit in lits))
+
+
+def _branch_literals(branches):
+    """Only one alternative has to match, so each of them needs to require
+    a literal for the branch to require one of them."""
+
+    ret = set()
+    for branch in branches:
+        sub = _sequence_literals(list(branch))
+        if not sub:
+            return None
+        ret.update(sub)
+    return ret
+
+
+def _decode(b):
+    return b.decode('utf-8', 'replace')
+
+
+# all registered patterns by key, in registration order
+_patterns = collections.OrderedDict()
+
+# pkg -> {filename: {key: [Hit, ...]}}
+_results = weakref.WeakKeyDictionary()
+
+# pkg -> set of the names of the files that could not be read
+_unreadable = weakref.WeakKeyDictionary()
+
+
+def register(key, regex, path_regex=None, find_all=False, only_if=None,
+             elf_sections=False):
+    """Registers the compiled @regex under the unique @key.
+
+    :param path_regex: only files whose name matches this regular expression
+                       are scanned for the pattern, all files otherwise.
+    :param find_all: return every matching line instead of the first one.
+    :param only_if: key of a previously registered pattern. The pattern is
+                    only evaluated for files in which that one matched.
+    :param elf_sections: for ELF files only scan the sections that can hold
+                         data, see ElfFile.data_sections(). Code does not
+                         need to be scanned for strings.
+    """
+
+    if only_if is not None and only_if not in _patterns:
+        raise Exception("unknown pattern {} for {}".format(only_if, key))
+
+    _patterns[key] = Pattern(key, regex, path_regex, find_all, only_if,
+                             elf_sections)
+    # a filter that already matches the empty name selects about every file,
+    # the payload is then unpacked completely and PayloadAccess does not
+    # read anything itself
+    if not path_regex or re.match(path_regex, ''):
+        PayloadAccess.register_all()
+    else:
+        PayloadAccess.register(('ContentScanner', key),
+                               regex=r'\A(?:%s)' % path_regex)
+
+
+def search(pkg, key, filename):
+    """Returns the list of Hit objects for the pattern registered as @key in
+    the file @filename of @pkg. Empty if the pattern did not match or was not
+    registered for the file."""
+
+    results = _results.setdefault(pkg, {})
+    if filename not in results:
+        results[filename] = _scan_file(pkg, filename)
+
+    return results[filename].get(key, [])
+
+
+def unreadable(pkg, filename):
+    """Returns whether search() could not read the file @filename of
+    @pkg."""
+
+    return filename in _unreadable.get(pkg, ())
+
+
+def _scan_file(pkg, filename):
+    ret = {}
+
+    pkgfile = HeaderFiles.files(pkg)[filename]
+    if pkgfile.is_ghost or not stat.S_ISREG(pkgfile.mode):
+        return ret
+
+    patterns = [p for p in _patterns.values() if p.wants(filename)]
+    if not patterns:
+        return ret
+
+    try:
+        with PayloadAccess.open(pkg, filename) as fd:
+            _scan_fd(fd, patterns, ret)
+    except (IOError, OSError) as e:
+        printWarning(pkg, 'read-error', filename, e)
+        _unreadable.setdefault(pkg, set()).add(filename)
+
+    # every pattern for the file has been evaluated
+    for p in patterns:
+        PayloadAccess.release(pkg, ('ContentScanner', p.key), filename)
+
+    return ret
+
+
+def _scan_fd(fd, patterns, ret):
+    """Scans the open file @fd for @patterns and stores their hits in @ret.
+    Patterns depending on others are evaluated in a further pass, once the
+    patterns they depend on have matched."""
+
+    view = ElfFile.FileView(fd)
+    size = view.size
+    whole = _limit(((0, size),))
+    sections = None
+    if any(p.elf_sections for p in patterns):
+        sections = _elf_regions(view)
+        if sections is not None:
+            sections = _limit(sections)
+
+    todo = list(patterns)
+    while todo:
+        ready = [p for p in todo if p.only_if is None or p.only_if in ret]
+        if not ready:
+            break
+        todo = [p for p in todo if p not in ready]
+
+        for p in ready:
+            if p.only_if is not None and not ret[p.only_if]:
+                ret[p.key] = []
+        ready = [p for p in ready if p.key not in ret]
+
+        for elf in (False, True):
+            group = [p for p in ready if (p.elf_sections and sections is not None) == elf]
+            if group:
+                _scan_regions(fd, sections if elf else whole, group, ret)
+
+
+def _limit(regions):
+    """Cuts @regions down to MAX_FILE_BYTES in total."""
+
+    if not MAX_FILE_BYTES:
+        return regions
+
+    ret = []
+    left = MAX_FILE_BYTES
+    for start, end in regions:
+        if left <= 0:
+            break
+        end = min(end, start + left)
+        left -= end - start
+        ret.append((start, end))
+    return ret
+
+
+def _scan_regions(fd, regions, patterns, ret):
+    for p in patterns:
+        ret[p.key] = []
+
+    if sum(end - start for start, end in regions) <= CHUNK_SIZE:
+        # small enough to be scanned in one go
+        parts = []
+        local = []
+        length = 0
+        for start, end in regions:
+            fd.seek(start)
+            parts.append(fd.read(end - start))
+            local.append((length, length + len(parts[-1])))
+            length += len(parts[-1])
+        buf = b''.join(parts)
+        for p in patterns:
+            ret[p.key] = [hit._replace(offset=_file_offset(regions, local, hit.offset))
+                          for hit in p.scan(buf, local)]
+        return
+
+    active = list(patterns)
+    overlap = max(p.width for p in patterns)
+    for start, end in regions:
+        if not active:
+            break
+        fd.seek(start)
+        pos = start
+        carry = b''
+        while active:
+            chunk = fd.read(min(CHUNK_SIZE, end - pos))
+            pos += len(chunk)
+            data = carry + chunk
+            base = pos - len(data)
+
+            if pos >= end or not chunk:
+                scan_end = cut = len(data)
+            else:
+                cut = data.rfind(b'\n') + 1
+                if cut:
+                    # complete lines only, the rest goes into the next round
+                    scan_end = cut
+                elif len(data) < LINE_LIMIT:
+                    carry = data
+                    continue
+                else:
+                    # no line end in sight, matches starting in the overlap
+                    # might be cut off and are found in the next round
+                    scan_end = len(data)
+                    cut = len(data) - overlap
+
+            for p in active:
+                for hit in p.scan(data, ((0, scan_end),)):
+                    if hit.offset < cut:
+                        ret[p.key].append(hit._replace(offset=base + hit.offset))
+                        if not p.find_all:
+                            break
+            active = [p for p in active if p.find_all or not ret[p.key]]
+
+            carry = data[cut:]
+            if pos >= end or not chunk:
+                break
+
+
+def _file_offset(regions, local, offset):
+    for (start, _), (local_start, local_end) in zip(regions, local):
+        if local_start <= offset < local_end:
+            return start + offset - local_start
+    return offset
+
+
+def _elf_regions(buf):
+    """Returns the (start, end) file regions of the data sections if @buf
+    holds an ELF file, None if it does not, cannot be parsed or has no
+    section header table, like sstripped binaries."""
+
+    if not ElfFile.is_elf(buf):
+        return None
+    try:
+        elf = ElfFile.ElfFile(buf)
+        if not elf.sections():
+            return None
+        return [(s.offset, s.offset + s.size) for s in elf.data_sections()]
+    except (ElfFile.ElfError, IndexError):
+        return None
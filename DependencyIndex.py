@@ -0,0 +1,76 @@
+# vim: sw=4 ts=4 sts=4 et :
+#############################################################################
+# Purpose       : indexed dependencies of a package, shared by the checks
+#############################################################################
+
+# Several checks look up particular names in the dependencies of a package.
+# The dependencies of each kind are indexed by name once per package, so
+# that the checks get set lookups instead of building their own sets from
+# the lists returned by Pkg.
+
+import weakref
+
+# dependency kinds, each one the name of the Pkg method returning them
+KINDS = ('requires', 'prereq', 'provides', 'conflicts', 'obsoletes',
+         'supplements', 'enhances', 'recommends', 'suggests')
+
+
+class Dependencies(object):
+    """The dependencies of one kind, a list of (name, flags, (epoch,
+    version, release)) tuples as returned by Pkg."""
+
+    def __init__(self, deps):
+        self.deps = list(deps)
+        # name -> first dependency on it
+        self.by_name = {}
+        for dep in self.deps:
+            self.by_name.setdefault(dep[0], dep)
+        self.names = frozenset(self.by_name)
+        # names without any (...) suffix, like foo for foo(x86-64)
+        self.base_names = frozenset(name.split('(')[0] for name in self.names)
+
+    def __contains__(self, name):
+        return name in self.by_name
+
+    def __iter__(self):
+        return iter(self.deps)
+
+    def __len__(self):
+        return len(self.deps)
+
+    def get(self, name):
+        """Returns the first dependency on @name, None if there is none."""
+
+        return self.by_name.get(name)
+
+
+class DependencyIndex(object):
+    """The dependencies of a package, one Dependencies attribute for each
+    of KINDS, and all_requires covering both requires and prereq."""
+
+    def __init__(self, pkg):
+        # a weak reference, the package is the key of the cache holding
+        # this and would never be released otherwise
+        self.pkg = weakref.proxy(pkg)
+
+    def __getattr__(self, kind):
+        if kind == 'all_requires':
+            deps = Dependencies(self.requires.deps + self.prereq.deps)
+        elif kind in KINDS:
+            deps = Dependencies(getattr(self.pkg, kind)())
+        else:
+            raise AttributeError(kind)
+        setattr(self, kind, deps)
+        return deps
+
+
+# pkg -> DependencyIndex
+_indexes = weakref.WeakKeyDictionary()
+
+
+def get(pkg):
+    """Returns the DependencyIndex of @pkg."""
+
+    if pkg not in _indexes:
+        _indexes[pkg] = DependencyIndex(pkg)
+    return _indexes[pkg]
@@ -7,9 +7,18 @@
 #############################################################################
 
 import AbstractCheck
+import atexit
+import Config
 import Filter
-import os
+import HeaderFiles
+import Pkg
+import rpm
 import stat
+import sys
+
+# when set, files duplicated between binary packages built from the same
+# source package are collected over the whole run and reported to this path
+CROSS_PACKAGE_REPORT = Config.getOption('DuplicatesCheck.CrossPackageReport', None)
 
 
 def get_prefix(file):
@@ -20,10 +29,74 @@ def get_prefix(file):
     return "/".join(pathlist[0:3])
 
 
+def get_inodes(pkg):
+    """Returns a dictionary mapping each file name to its (device, inode)
+    pair as recorded in the package header. Files sharing the same pair are
+    hardlinks of each other, no access to the payload is necessary."""
+    names = pkg.header[rpm.RPMTAG_FILENAMES] or []
+    inodes = pkg.header[rpm.RPMTAG_FILEINODES] or []
+    devices = pkg.header[rpm.RPMTAG_FILEDEVICES] or []
+    if len(devices) != len(names):
+        devices = [0] * len(names)
+
+    return {Pkg.b2s(name): (dev, ino)
+            for name, dev, ino in zip(names, devices, inodes)}
+
+
+class SourceDuplicatesIndex(object):
+    """Run-wide index of file digests, grouped by the source package the
+    checked binary packages were built from. For every digest only the
+    first occurrence is remembered, so the memory needed is proportional
+    to the number of distinct digests plus the duplicates found.
+
+    Each further binary package carrying the same content counts as one
+    wasted copy."""
+
+    def __init__(self):
+        # source rpm -> {digest: (package, path, size)}
+        self.digests = {}
+        # source rpm -> [(size, (package, path), (package, path)), ...]
+        self.duplicates = {}
+
+    def add_package(self, pkg, regular_files):
+        srpm = sys.intern(Pkg.b2s(pkg.header[rpm.RPMTAG_SOURCERPM] or ''))
+        name = sys.intern(pkg.name)
+        seen = self.digests.setdefault(srpm, {})
+        # copies within this package are reported by the check itself
+        counted = set()
+
+        for f, pkgfile in sorted(regular_files):
+            if not pkgfile.size or not pkgfile.md5:
+                continue
+            first = seen.setdefault(pkgfile.md5, (name, f, pkgfile.size))
+            if first[0] != name and pkgfile.md5 not in counted:
+                counted.add(pkgfile.md5)
+                self.duplicates.setdefault(srpm, []).append(
+                    (pkgfile.size, first[:2], (name, f)))
+
+    def write_report(self, path):
+        with open(path, 'w') as out:
+            for srpm in sorted(self.duplicates):
+                waste = 0
+                for size, first, dupe in sorted(self.duplicates[srpm]):
+                    waste += size
+                    print("files-duplicate-across-packages %s: %s:%s %s:%s %d" %
+                          ((srpm,) + first + dupe + (size,)), file=out)
+                print("files-duplicated-waste-across-packages %s: %d" %
+                      (srpm, waste), file=out)
+
+
 class DuplicatesCheck(AbstractCheck.AbstractCheck):
+    needs_payload = False
+
     def __init__(self):
         self.map = []
         AbstractCheck.AbstractCheck.__init__(self, "DuplicatesCheck")
+        self.source_index = None
+        if CROSS_PACKAGE_REPORT:
+            self.source_index = SourceDuplicatesIndex()
+            atexit.register(self.source_index.write_report,
+                            CROSS_PACKAGE_REPORT)
 
     def check(self, pkg):
 
@@ -32,11 +105,13 @@ class DuplicatesCheck(AbstractCheck.AbstractCheck):
 
         md5s = {}
         sizes = {}
-        files = pkg.files()
-        configFiles = pkg.configFiles()
+        files = HeaderFiles.files(pkg)
+        ghostFiles = HeaderFiles.ghost_files(pkg)
+        configFiles = HeaderFiles.config_files(pkg)
+        regular_files = []
 
         for f, pkgfile in files.items():
-            if f in pkg.ghostFiles():
+            if f in ghostFiles:
                 continue
 
             if not stat.S_ISREG(pkgfile.mode):
@@ -44,6 +119,12 @@ class DuplicatesCheck(AbstractCheck.AbstractCheck):
 
             md5s.setdefault(pkgfile.md5, set()).add(f)
             sizes[pkgfile.md5] = pkgfile.size
+            regular_files.append((f, pkgfile))
+
+        if self.source_index:
+            self.source_index.add_package(pkg, regular_files)
+
+        inodes = get_inodes(pkg)
 
         sum = 0
         for f in md5s:
@@ -51,38 +132,49 @@ class DuplicatesCheck(AbstractCheck.AbstractCheck):
             if len(duplicates) == 1:
                 continue
 
-            one = duplicates.pop()
-            one_is_config = False
-            if one in configFiles:
-                one_is_config = True
-
-            partition = get_prefix(one)
-
-            st = os.stat(pkg.dirName() + '/' + one)
-            diff = 1 + len(duplicates) - st[stat.ST_NLINK]
-            if diff <= 0:
-                for dupe in duplicates:
+            # group the files with identical content by inode, the members
+            # of each group are hardlinked to each other
+            links = {}
+            for dupe in sorted(duplicates):
+                links.setdefault(inodes.get(dupe, dupe), []).append(dupe)
+            groups = sorted(links.values())
+
+            for group in groups:
+                one = group[0]
+                partition = get_prefix(one)
+                one_is_config = one in configFiles
+                for dupe in group[1:]:
                     if partition != get_prefix(dupe):
                         Filter.printError(pkg, "hardlink-across-partition",
                                           one, dupe)
                     if one_is_config and dupe in configFiles:
                         Filter.printError(pkg, "hardlink-across-config-files",
                                           one, dupe)
+
+            if len(groups) == 1:
                 continue
 
-            for dupe in duplicates:
-                if partition != get_prefix(dupe):
-                    diff = diff - 1
+            # within a partition all copies could have been hardlinked to a
+            # single one, hardlinks across partitions are not possible
+            partitions = {}
+            for i, group in enumerate(groups):
+                for dupe in group:
+                    partitions.setdefault(get_prefix(dupe), set()).add(i)
+            diff = 0
+            for linkable in partitions.values():
+                diff += len(linkable) - 1
+
+            one = groups[0][0]
             sum += sizes[f] * diff
             if sizes[f] and diff > 0:
                 Filter.printWarning(pkg, 'files-duplicate', one,
-                                    ":".join(sorted(duplicates)))
+                                    ":".join(sorted(duplicates - {one})))
 
         if sum > 100000:
             Filter.printError(pkg, 'files-duplicated-waste', sum)
 
 
-check = DuplicatesCheck()
+check = HeaderFiles.register(DuplicatesCheck())
 
 Filter.addDetails(
 'files-duplicated-waste',
@@ -0,0 +1,380 @@
+# vim: sw=4 ts=4 sts=4 et :
+#############################################################################
+# Purpose       : minimal in-process reader for ELF headers and sections
+#############################################################################
+
+import collections
+import os
+import struct
+
+ELFMAG = b'\x7fELF'
+
+ELFCLASS32 = 1
+ELFCLASS64 = 2
+ELFDATA2LSB = 1
+ELFDATA2MSB = 2
+
+ET_REL = 1
+ET_EXEC = 2
+ET_DYN = 3
+ET_CORE = 4
+
+PT_DYNAMIC = 2
+PT_INTERP = 3
+
+SHN_UNDEF = 0
+SHN_XINDEX = 0xffff
+
+SHT_NULL = 0
+SHT_PROGBITS = 1
+SHT_STRTAB = 3
+SHT_DYNAMIC = 6
+SHT_NOTE = 7
+SHT_NOBITS = 8
+SHT_DYNSYM = 11
+
+SHF_EXECINSTR = 0x4
+
+DT_NULL = 0
+DT_NEEDED = 1
+DT_SONAME = 14
+DT_RPATH = 15
+DT_RUNPATH = 29
+DT_FLAGS_1 = 0x6ffffffb
+
+DF_1_PIE = 0x08000000
+
+STB_LOCAL = 0
+STB_GLOBAL = 1
+STB_WEAK = 2
+STB_GNU_UNIQUE = 10
+
+# PROGBITS sections that only hold binary tables for the runtime
+_TABLE_SECTIONS = (
+    '.eh_frame',
+    '.eh_frame_hdr',
+    '.gcc_except_table',
+    '.got',
+    '.got.plt',
+)
+
+Section = collections.namedtuple(
+    'Section',
+    ('name', 'type', 'flags', 'addr', 'offset', 'size', 'link', 'info',
+     'entsize'))
+
+Segment = collections.namedtuple(
+    'Segment', ('type', 'flags', 'offset', 'vaddr', 'filesz', 'memsz'))
+
+Symbol = collections.namedtuple('Symbol', ('name', 'bind', 'type', 'shndx'))
+
+# layouts following e_ident, for ELFCLASS32 and ELFCLASS64
+_EHDR = {
+    ELFCLASS32: 'HHIIIIIHHHHHH',
+    ELFCLASS64: 'HHIQQQIHHHHHH',
+}
+# p_type p_offset p_vaddr p_paddr p_filesz p_memsz p_flags p_align for
+# ELFCLASS32, p_type p_flags p_offset p_vaddr p_paddr p_filesz p_memsz
+# p_align for ELFCLASS64
+_PHDR = {
+    ELFCLASS32: 'IIIIIIII',
+    ELFCLASS64: 'IIQQQQQQ',
+}
+# sh_name sh_type sh_flags sh_addr sh_offset sh_size sh_link sh_info
+# sh_addralign sh_entsize
+_SHDR = {
+    ELFCLASS32: 'IIIIIIIIII',
+    ELFCLASS64: 'IIQQQQIIQQ',
+}
+# d_tag d_val
+_DYN = {
+    ELFCLASS32: 'iI',
+    ELFCLASS64: 'qQ',
+}
+# st_name st_value st_size st_info st_other st_shndx for ELFCLASS32,
+# st_name st_info st_other st_shndx st_value st_size for ELFCLASS64
+_SYM = {
+    ELFCLASS32: 'IIIBBH',
+    ELFCLASS64: 'IBBHQQ',
+}
+
+
+class ElfError(Exception):
+    pass
+
+
+def is_elf(buf):
+    return buf[:4] == ELFMAG
+
+
+class FileView(object):
+    """Random read access to an open binary file with the indexing, slicing
+    and find() interface ElfFile expects from its buffer, without reading
+    more of the file than what is asked for."""
+
+    def __init__(self, fd):
+        self.fd = fd
+        # works for in-memory files as well, unlike fstat()
+        self.size = fd.seek(0, os.SEEK_END)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, _ = key.indices(self.size)
+            if stop <= start:
+                return b''
+            self.fd.seek(start)
+            return self.fd.read(stop - start)
+
+        if key < 0:
+            key += self.size
+        if not 0 <= key < self.size:
+            raise IndexError("file offset out of range")
+        self.fd.seek(key)
+        return self.fd.read(1)[0]
+
+    def find(self, sub, start=0, end=None):
+        ret = self[start:end].find(sub)
+        return ret + start if ret >= 0 else ret
+
+
+class SparseView(object):
+    """Read access to the parts of a file of @size bytes that are known,
+    given as (offset, data) @chunks. Asking for anything else raises an
+    ElfError, like asking for data beyond the end of the file does."""
+
+    def __init__(self, size, chunks):
+        self.size = size
+        self.chunks = chunks
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, _ = key.indices(self.size)
+            if stop <= start:
+                return b''
+            for offset, data in self.chunks:
+                if offset <= start and stop <= offset + len(data):
+                    return data[start - offset:stop - offset]
+            raise ElfError("file data not read")
+        return self[key:key + 1][0]
+
+    def find(self, sub, start=0, end=None):
+        ret = self[start:end].find(sub)
+        return ret + start if ret >= 0 else ret
+
+
+class ElfFile(object):
+    """Parses the ELF header and the section header table of the ELF image
+    in @buf. @buf can be anything supporting slicing, like bytes or an mmap
+    object, only the parts of it that are actually needed are looked at."""
+
+    def __init__(self, buf):
+        if not is_elf(buf) or len(buf) < 16:
+            raise ElfError("not an ELF file")
+
+        self.buf = buf
+        self.elfclass = buf[4]
+        data = buf[5]
+        if self.elfclass not in _EHDR or data not in (ELFDATA2LSB, ELFDATA2MSB):
+            raise ElfError("unsupported ELF class or data encoding")
+        self.endian = '<' if data == ELFDATA2LSB else '>'
+
+        (self.e_type, self.e_machine, _, self.e_entry, self.e_phoff,
+         self.e_shoff, self.e_flags, _, self.e_phentsize, self.e_phnum,
+         self.e_shentsize, self.e_shnum,
+         self.e_shstrndx) = self.unpack(_EHDR[self.elfclass], 16)
+
+        self.m_segments = None
+        self.m_sections = None
+        self.m_dynamic = None
+
+    def unpack(self, fmt, offset):
+        fmt = self.endian + fmt
+        end = offset + struct.calcsize(fmt)
+        if offset < 0 or end > len(self.buf):
+            raise ElfError("truncated ELF file")
+        return struct.unpack(fmt, self.buf[offset:end])
+
+    def segments(self):
+        """Returns the list of Segment tuples from the program header
+        table."""
+
+        if self.m_segments is not None:
+            return self.m_segments
+
+        segments = []
+        for i in range(self.e_phnum if self.e_phoff else 0):
+            phdr = self.unpack(_PHDR[self.elfclass],
+                               self.e_phoff + i * self.e_phentsize)
+            if self.elfclass == ELFCLASS32:
+                p_type, offset, vaddr, _, filesz, memsz, flags, _ = phdr
+            else:
+                p_type, flags, offset, vaddr, _, filesz, memsz, _ = phdr
+            segments.append(Segment(p_type, flags, offset, vaddr, filesz,
+                                    memsz))
+        self.m_segments = segments
+        return segments
+
+    def dynamic_flags_1(self):
+        """Returns the DT_FLAGS_1 entry of the dynamic segment, 0 if there
+        is none. Unlike dynamic(), this only needs the program headers."""
+
+        fmt = self.endian + _DYN[self.elfclass]
+        for s in self.segments():
+            if s.type != PT_DYNAMIC:
+                continue
+            if s.offset + s.filesz > len(self.buf):
+                raise ElfError("dynamic segment exceeds file")
+            data = self.buf[s.offset:s.offset + s.filesz]
+            data = data[:len(data) - len(data) % struct.calcsize(fmt)]
+            for tag, value in struct.iter_unpack(fmt, data):
+                if tag == DT_NULL:
+                    break
+                if tag == DT_FLAGS_1:
+                    return value
+        return 0
+
+    def _section_header(self, index):
+        return self.unpack(_SHDR[self.elfclass],
+                           self.e_shoff + index * self.e_shentsize)
+
+    def sections(self):
+        """Returns the list of Section tuples from the section header table,
+        with their names resolved."""
+
+        if self.m_sections is not None:
+            return self.m_sections
+
+        self.m_sections = []
+        if not self.e_shoff:
+            return self.m_sections
+
+        shnum = self.e_shnum
+        shstrndx = self.e_shstrndx
+        if not shnum or shstrndx == SHN_XINDEX:
+            # extended numbering, the real values live in section 0
+            first = self._section_header(0)
+            shnum = shnum or first[5]
+            if shstrndx == SHN_XINDEX:
+                shstrndx = first[6]
+
+        headers = [self._section_header(i) for i in range(shnum)]
+        names = headers[shstrndx] if shstrndx < shnum else None
+
+        for hdr in headers:
+            name = ''
+            if names:
+                name = self.string(names[4], names[5], hdr[0])
+            self.m_sections.append(Section(name, *(hdr[1:8] + hdr[9:10])))
+
+        return self.m_sections
+
+    def string(self, table_offset, table_size, index):
+        """Returns the NUL terminated string at @index of the string table
+        found at @table_offset."""
+
+        if index >= table_size:
+            raise ElfError("string index out of range")
+        start = table_offset + index
+        end = self.buf.find(b'\0', start, table_offset + table_size)
+        if end < 0:
+            end = table_offset + table_size
+        return self.buf[start:end].decode('utf-8', 'replace')
+
+    def data_sections(self):
+        """Yields the sections holding constant or initialized data, string
+        tables and notes, i.e. everything but code, uninitialized data,
+        unwind and relocation tables and the purely structural sections."""
+
+        for s in self.sections():
+            if s.type not in (SHT_PROGBITS, SHT_STRTAB, SHT_NOTE):
+                continue
+            if s.flags & SHF_EXECINSTR or s.name in _TABLE_SECTIONS:
+                continue
+            if s.offset + s.size > len(self.buf):
+                raise ElfError("section {} exceeds file".format(s.name))
+            yield s
+
+    def section_data(self, section):
+        if section.offset + section.size > len(self.buf):
+            raise ElfError("section {} exceeds file".format(section.name))
+        return self.buf[section.offset:section.offset + section.size]
+
+    def _linked_strings(self, section):
+        sections = self.sections()
+        if section.link >= len(sections):
+            raise ElfError("invalid string table of {}".format(section.name))
+        return self.section_data(sections[section.link])
+
+    def dynamic(self):
+        """Returns the list of (tag, value) entries of the dynamic section,
+        with string values resolved for DT_NEEDED, DT_SONAME, DT_RPATH and
+        DT_RUNPATH."""
+
+        if self.m_dynamic is not None:
+            return self.m_dynamic
+
+        self.m_dynamic = []
+        for s in self.sections():
+            if s.type != SHT_DYNAMIC:
+                continue
+            strings = self._linked_strings(s)
+            fmt = self.endian + _DYN[self.elfclass]
+            data = self.section_data(s)
+            data = data[:len(data) - len(data) % struct.calcsize(fmt)]
+            for tag, value in struct.iter_unpack(fmt, data):
+                if tag == DT_NULL:
+                    break
+                if tag in (DT_NEEDED, DT_SONAME, DT_RPATH, DT_RUNPATH):
+                    value = _cstring(strings, value)
+                self.m_dynamic.append((tag, value))
+            break
+
+        return self.m_dynamic
+
+    def needed(self):
+        return [value for tag, value in self.dynamic() if tag == DT_NEEDED]
+
+    def dynamic_symbols(self):
+        """Yields the Symbol tuples of the dynamic symbol table."""
+
+        for s in self.sections():
+            if s.type != SHT_DYNSYM:
+                continue
+            strings = self._linked_strings(s)
+            fmt = self.endian + _SYM[self.elfclass]
+            data = self.section_data(s)
+            data = data[:len(data) - len(data) % struct.calcsize(fmt)]
+            for sym in struct.iter_unpack(fmt, data):
+                if self.elfclass == ELFCLASS32:
+                    name, _, _, info, _, shndx = sym
+                else:
+                    name, info, _, shndx, _, _ = sym
+                yield Symbol(_cstring(strings, name), info >> 4, info & 0xf,
+                             shndx)
+
+    def undefined_symbols(self):
+        """Returns the set of names of the symbols this object needs from
+        others."""
+
+        return set(sym.name for sym in self.dynamic_symbols()
+                   if sym.shndx == SHN_UNDEF and sym.name)
+
+    def defined_symbols(self):
+        """Returns the set of names of the symbols this object exports."""
+
+        return set(sym.name for sym in self.dynamic_symbols()
+                   if sym.shndx != SHN_UNDEF and sym.name and
+                   sym.bind in (STB_GLOBAL, STB_WEAK, STB_GNU_UNIQUE))
+
+
+def _cstring(table, index):
+    end = table.find(b'\0', index)
+    if end < 0:
+        end = len(table)
+    return table[index:end].decode('utf-8', 'replace')
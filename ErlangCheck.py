@@ -7,33 +7,61 @@
 #############################################################################
 
 import AbstractCheck
+import BeamFile
 import Filter
+import HeaderFiles
+import PayloadAccess
 import Pkg
 import re
+import ResultCache
 import rpm
 
-from pybeam import BeamFile
 
+class ErlangCheck(AbstractCheck.AbstractCheck):
+    needs_payload = True
 
-class ErlangCheck(AbstractCheck.AbstractFilesCheck):
     def __init__(self):
-        AbstractCheck.AbstractFilesCheck.__init__(
-            self, "ErlangCheck", r'.*?\.beam$')
+        AbstractCheck.AbstractCheck.__init__(self, "ErlangCheck")
+        PayloadAccess.register("ErlangCheck", suffixes=('.beam',))
         build_dir = rpm.expandMacro("%_builddir")
         self.source_re = re.compile(build_dir)
+        self.cache = ResultCache.ResultCache('ErlangCheck', 1)
+
+    def check(self, pkg):
+        if pkg.isSource():
+            return
+
+        for filename in PayloadAccess.files(pkg, "ErlangCheck"):
+            self.check_file(pkg, filename)
+        PayloadAccess.release(pkg, "ErlangCheck")
 
     def check_file(self, pkg, filename):
-        beam = BeamFile(pkg.files()[filename].path)
-        if 'debug_info' not in beam.compileinfo['options']:
-            Filter.printWarning(
-                pkg, "beam-compiled-without-debug_info", filename)
-        if not self.source_re.match(Pkg.b2s(beam.compileinfo['source'].value)):
-            Filter.printWarning(
-                pkg, "beam-was-not-recompiled", filename,
-                beam.compileinfo['source'].value)
+        pkgfile = HeaderFiles.files(pkg)[filename]
+        findings = self.cache.get(
+            pkgfile, lambda: self.file_findings(pkg, filename),
+            (self.source_re.pattern,))
+        ResultCache.report(pkg, filename, findings)
+
+    def file_findings(self, pkg, filename):
+        findings = []
+        try:
+            with PayloadAccess.open(pkg, filename) as fd:
+                compileinfo = BeamFile.compile_info(fd)
+        except (IOError, OSError, BeamFile.BeamError):
+            return None
+        if 'debug_info' not in compileinfo.get('options', ()):
+            findings.append(('W', "beam-compiled-without-debug_info"))
+        source = compileinfo.get('source', b'')
+        if isinstance(source, list):
+            # code points beyond latin-1 do not fit a STRING_EXT
+            source = ''.join(chr(c) for c in source if isinstance(c, int))
+        source = Pkg.b2s(source)
+        if not self.source_re.match(source):
+            findings.append(('W', "beam-was-not-recompiled", source))
+        return findings
 
 
-check = ErlangCheck()
+check = HeaderFiles.register(ErlangCheck())
 
 Filter.addDetails(
 'beam-compiled-without-debug_info',
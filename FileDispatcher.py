@@ -0,0 +1,119 @@
+# vim: sw=4 ts=4 sts=4 et :
+#############################################################################
+# Purpose       : hand checks only the files of a package they care about
+#############################################################################
+
+# Most checks are only interested in a few files below some directory. Instead
+# of every check walking the complete file list of a package, checks register
+# the path prefixes, suffixes and regular expressions they care about once at
+# construction time. The first time any check asks for its files, the file
+# list is walked once, looking up the prefixes in a trie, and the matching
+# files are kept for the package so that the other checks just get their
+# share.
+
+import collections
+import re
+import weakref
+
+import HeaderFiles
+
+# trie node key holding the selectors whose prefix ends at the node
+_END = ''
+
+
+class Selector(object):
+    """The files a check registered for. A file is selected if it starts
+    with one of @prefixes, ends with one of @suffixes and matches @regex,
+    each of which is not checked when not given."""
+
+    def __init__(self, key, prefixes, suffixes, regex):
+        self.key = key
+        self.prefixes = tuple(prefixes)
+        self.suffixes = tuple(suffixes)
+        if isinstance(regex, str):
+            regex = re.compile(regex)
+        self.regex = regex
+
+    def accepts(self, filename):
+        """Checks everything but the prefixes, which are looked up in the
+        trie."""
+
+        return ((not self.suffixes or filename.endswith(self.suffixes)) and
+                (not self.regex or self.regex.search(filename)))
+
+
+# all registered selectors by key, in registration order
+_selectors = collections.OrderedDict()
+
+# prefix trie of the selectors with prefixes, built on first use
+_trie = None
+
+# pkg -> {key: [filename, ...]}
+_results = weakref.WeakKeyDictionary()
+
+
+def register(key, prefixes=(), suffixes=(), regex=None):
+    """Registers the files the check with the unique @key wants to see.
+
+    :param prefixes: sequence of path prefixes, a file has to start with one
+                     of them.
+    :param suffixes: sequence of suffixes, a file has to end with one of
+                     them.
+    :param regex: regular expression, compiled or not, that has to match
+                  somewhere in the file name.
+    """
+
+    global _trie
+
+    _selectors[key] = Selector(key, prefixes, suffixes, regex)
+    _trie = None
+
+
+def files(pkg, key):
+    """Returns the names of the files of @pkg selected by the selector
+    registered as @key, in the order of the package header."""
+
+    results = _results.get(pkg)
+    if results is None or key not in results:
+        results = _results[pkg] = _dispatch(pkg)
+    return results[key]
+
+
+def _build_trie():
+    trie = {}
+    for selector in _selectors.values():
+        for prefix in selector.prefixes:
+            node = trie
+            for c in prefix:
+                node = node.setdefault(c, {})
+            node.setdefault(_END, []).append(selector)
+    return trie
+
+
+def _dispatch(pkg):
+    global _trie
+
+    if _trie is None:
+        _trie = _build_trie()
+
+    ret = {key: [] for key in _selectors}
+    unrooted = [s for s in _selectors.values() if not s.prefixes]
+    root_selectors = _trie.get(_END, [])
+
+    for filename in HeaderFiles.files(pkg):
+        candidates = root_selectors + unrooted
+        node = _trie
+        for c in filename:
+            node = node.get(c)
+            if node is None:
+                break
+            if _END in node:
+                candidates = candidates + node[_END]
+
+        seen = set()
+        for selector in candidates:
+            if selector.key not in seen and selector.accepts(filename):
+                seen.add(selector.key)
+                ret[selector.key].append(filename)
+
+    return ret
@@ -0,0 +1,237 @@
+# vim: sw=4 ts=4 sts=4 et :
+#############################################################################
+# Purpose       : recognize the file types checks care about from the head
+#############################################################################
+
+# Checks used to decide on the type of a file by looking at the description
+# libmagic gave for it, which means classifying every file of a package.
+# The few types they actually care about can be told from the first bytes
+# of a file: ELF objects and their type, scripts and their interpreter, and
+# the dimensions of the image formats icons come in.
+
+import collections
+import os
+import re
+import struct
+
+import ElfFile
+
+# number of bytes at the start of a file identify() looks at
+HEAD_SIZE = 1024
+
+# dynamic segments up to this size are read to tell PIEs from libraries
+DYNAMIC_SIZE_LIMIT = 64 * 1024
+
+# what identify() found out about a file. kind is one of 'elf', 'script',
+# 'png', 'xpm', 'ico', 'gif', 'bmp', 'svg' or None if the type is not known.
+# elf_type is the type of an ELF object as described by file(1), like 'pie
+# executable'. interpreter is the command of a script, sizes the tuple of
+# the (width, height) of the images in an image file, several for ICO files
+# only. Each is None if unknown or not applicable.
+FileType = collections.namedtuple(
+    'FileType', ('kind', 'elf_type', 'interpreter', 'sizes'))
+
+UNKNOWN = FileType(None, None, None, None)
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# reserved word and type 1 of the ICONDIR structure
+ICO_SIGNATURE = b'\0\0\1\0'
+
+GIF_SIGNATURES = (b'GIF87a', b'GIF89a')
+
+BMP_SIGNATURE = b'BM'
+
+# sizes of the BITMAPINFOHEADER and its later versions
+_BMP_INFO_HEADER_SIZES = (40, 52, 56, 64, 108, 124)
+
+_ELF_TYPES = {
+    ElfFile.ET_REL: 'relocatable',
+    ElfFile.ET_EXEC: 'executable',
+    ElfFile.ET_CORE: 'core file',
+}
+
+_xpm_values_re = re.compile(br'\{[^"]*"\s*(\d+)\s+(\d+)\s')
+_svg_tag_re = re.compile(br'<svg\b[^>]*>', re.DOTALL)
+_svg_length_re = r'\b%s\s*=\s*["\']\s*(\d+(?:\.\d*)?)\s*(?:px)?\s*["\']'
+_svg_viewbox_re = re.compile(
+    r'\bviewBox\s*=\s*["\']\s*(?:[-\d.eE]+[\s,]+){2}'
+    r'(\d+(?:\.\d*)?)[\s,]+(\d+(?:\.\d*)?)\s*["\']')
+
+
+def elf_type(elf):
+    """Returns the type of the ElfFile @elf as described by file(1). A
+    shared object is an executable if it is flagged DF_1_PIE, or, if its
+    dynamic segment is not available, if it asks for an interpreter."""
+
+    if elf.e_type != ElfFile.ET_DYN:
+        return _ELF_TYPES.get(elf.e_type)
+
+    try:
+        pie = elf.dynamic_flags_1() & ElfFile.DF_1_PIE
+    except ElfFile.ElfError:
+        try:
+            pie = any(s.type == ElfFile.PT_INTERP for s in elf.segments())
+        except ElfFile.ElfError:
+            pie = False
+    return 'pie executable' if pie else 'shared object'
+
+
+def dynamic_segment(head):
+    """Returns the (offset, size) of the dynamic segment of the shared
+    object starting with @head, None if it is not one, its program headers
+    are not part of @head or the segment exceeds DYNAMIC_SIZE_LIMIT."""
+
+    if not ElfFile.is_elf(head):
+        return None
+    try:
+        elf = ElfFile.ElfFile(head)
+        if elf.e_type != ElfFile.ET_DYN:
+            return None
+        for s in elf.segments():
+            if s.type == ElfFile.PT_DYNAMIC and \
+                    s.filesz <= DYNAMIC_SIZE_LIMIT:
+                return s.offset, s.filesz
+    except ElfFile.ElfError:
+        pass
+    return None
+
+
+def identify_elf(buf):
+    """Returns the FileType of the ELF file in @buf, anything ElfFile
+    takes."""
+
+    try:
+        return FileType('elf', elf_type(ElfFile.ElfFile(buf)), None, None)
+    except ElfFile.ElfError:
+        return FileType('elf', None, None, None)
+
+
+def interpreter(head):
+    """Returns the command named in the #! line at the start of @head,
+    looking through /usr/bin/env, None if there is none."""
+
+    if not head.startswith(b'#!'):
+        return None
+    words = head[2:].split(b'\n', 1)[0].decode('utf-8', 'replace').split()
+    if words and os.path.basename(words[0]) == 'env':
+        words = [w for w in words[1:] if not w.startswith('-')]
+    return words[0] if words else None
+
+
+def _svg_size(head):
+    """Returns the size of the SVG image starting with @head, as given by
+    the width and height attributes in pixels, or the viewBox otherwise."""
+
+    tag = _svg_tag_re.search(head)
+    if not tag:
+        return None
+    tag = tag.group(0).decode('utf-8', 'replace')
+    size = [re.search(_svg_length_re % attr, tag)
+            for attr in ('width', 'height')]
+    if not all(size):
+        size = _svg_viewbox_re.search(tag)
+        size = size and size.groups()
+    else:
+        size = [m.group(1) for m in size]
+    return size and tuple(int(round(float(n))) for n in size)
+
+
+def _ico_sizes(head):
+    """Returns the sizes of all images in the ICO file starting with @head,
+    None if its image directory does not look sane."""
+
+    count = struct.unpack('<H', head[4:6])[0]
+    entries = head[6:6 + 16 * count]
+    if not count or len(entries) < 16 * count:
+        return None
+    sizes = []
+    for i in range(0, len(entries), 16):
+        # a reserved byte, and a width or height of 0 means 256
+        if entries[i + 3] != 0:
+            return None
+        sizes.append((entries[i] or 256, entries[i + 1] or 256))
+    return tuple(sizes)
+
+
+def _bmp_size(head):
+    """Returns the size of the BMP image starting with @head, taken from its
+    BITMAPCOREHEADER or BITMAPINFOHEADER, None if it has neither."""
+
+    # the reserved words of the file header
+    if head[6:10] != b'\0\0\0\0':
+        return None
+    header_size = struct.unpack('<I', head[14:18])[0]
+    if header_size == 12:
+        return struct.unpack('<HH', head[18:22])
+    if header_size in _BMP_INFO_HEADER_SIZES:
+        # the height is negative for images stored top-down
+        width, height = struct.unpack('<ii', head[18:26])
+        return width, abs(height)
+    return None
+
+
+def _image(kind, size):
+    return FileType(kind, None, None, (size,) if size else None)
+
+
+def identify(head):
+    """Returns the FileType of a file starting with the bytes @head, of
+    which the first HEAD_SIZE bytes are looked at."""
+
+    head = head[:HEAD_SIZE]
+
+    if ElfFile.is_elf(head):
+        return identify_elf(head)
+
+    if head.startswith(b'#!'):
+        return FileType('script', None, interpreter(head), None)
+
+    if head.startswith(PNG_SIGNATURE) and head[12:16] == b'IHDR' and \
+            len(head) >= 24:
+        return _image('png', struct.unpack('>II', head[16:24]))
+
+    if head.startswith(b'/* XPM */'):
+        m = _xpm_values_re.search(head)
+        return _image('xpm', m and (int(m.group(1)), int(m.group(2))))
+
+    if head[:6] in GIF_SIGNATURES and len(head) >= 10:
+        # the logical screen size
+        return _image('gif', struct.unpack('<HH', head[6:10]))
+
+    if head.startswith(BMP_SIGNATURE) and len(head) >= 26:
+        size = _bmp_size(head)
+        if size:
+            return _image('bmp', size)
+
+    if head.startswith(ICO_SIGNATURE) and len(head) >= 6:
+        sizes = _ico_sizes(head)
+        if sizes:
+            return FileType('ico', None, None, sizes)
+
+    if b'<svg' in head:
+        return _image('svg', _svg_size(head))
+
+    return UNKNOWN
+
+
+def identify_file(fd):
+    """Returns the FileType of the open file @fd. Unlike identify(), this
+    tells PIEs from libraries whose dynamic segment lies beyond the head."""
+
+    file_type = identify(fd.read(HEAD_SIZE))
+    if file_type.kind == 'elf':
+        file_type = identify_elf(ElfFile.FileView(fd))
+    return file_type
+
+
+def is_elf(file_type):
+    return file_type.kind == 'elf'
+
+
+def is_shell_script(file_type):
+    """Returns whether @file_type is what file(1) calls a POSIX shell
+    script."""
+
+    return (file_type.kind == 'script' and
+            os.path.basename(file_type.interpreter or '') == 'sh')
@@ -0,0 +1,153 @@
+# vim: sw=4 ts=4 sts=4 et :
+#############################################################################
+# Purpose       : file list of a package from its header, without payload
+#############################################################################
+
+# pkg.files() unpacks the whole payload before it returns, just to fill in
+# the path of each file. Checks that only look at file names and the file
+# metadata recorded in the header use the file list built here instead and
+# declare so by setting needs_payload to False.
+#
+# With HeaderOnly set, only those of the checks here are run. This does not
+# cover the checks built into rpmlint, FilesCheck, BinariesCheck and most
+# others call pkg.files() and unpack the payload as before. For the payload
+# to be never unpacked, they have to be removed through the configuration
+# as well, by starting from Config.resetChecks() and adding the checks
+# wanted like singlecheck does. Linting a large number of packages is then
+# a matter of reading their headers.
+
+import os
+import weakref
+
+import Config
+import Pkg
+import rpm
+
+HEADER_ONLY = Config.getOption('HeaderOnly', False)
+
+# pkg -> {filename: PkgFile}
+_files = weakref.WeakKeyDictionary()
+
+# pkg -> {PkgFile property: set of filenames}
+_flagged_files = weakref.WeakKeyDictionary()
+
+
+def _header_list(pkg, tag, count, default):
+    values = pkg.header[tag]
+    # rpm-python might not return a list for packages with a single file
+    if values is not None and not isinstance(values, list):
+        values = [values]
+    if not values or len(values) != count:
+        values = [default] * count
+    return values
+
+
+def files(pkg):
+    """Returns a dictionary mapping the file names of @pkg to Pkg.PkgFile
+    objects filled in from the header. The path of each file is its name,
+    there is nothing unpacked to point to."""
+
+    if pkg in _files:
+        return _files[pkg]
+
+    names = [Pkg.b2s(n) for n in pkg.header[rpm.RPMTAG_FILENAMES] or []]
+    count = len(names)
+    columns = zip(
+        names,
+        _header_list(pkg, rpm.RPMTAG_FILEFLAGS, count, 0),
+        _header_list(pkg, rpm.RPMTAG_FILEMODES, count, 0),
+        _header_list(pkg, rpm.RPMTAG_FILEUSERNAME, count, None),
+        _header_list(pkg, rpm.RPMTAG_FILEGROUPNAME, count, None),
+        _header_list(pkg, rpm.RPMTAG_FILELINKTOS, count, ''),
+        _header_list(pkg, rpm.RPMTAG_FILESIZES, count, None),
+        _header_list(pkg, rpm.RPMTAG_FILEMD5S, count, None),
+        _header_list(pkg, rpm.RPMTAG_FILEINODES, count, 0),
+        _header_list(pkg, rpm.RPMTAG_FILELANGS, count, ''),
+        _header_list(pkg, rpm.RPMTAG_FILECLASS, count, ''),
+        _header_list(pkg, rpm.RPMTAG_FILECAPS, count, None))
+
+    ret = {}
+    for (name, flags, mode, user, group, linkto, size, md5, inode, lang,
+         magic, filecaps) in columns:
+        pkgfile = Pkg.PkgFile(name)
+        pkgfile.flags = flags
+        pkgfile.mode = mode & 0xffff
+        pkgfile.user = Pkg.b2s(user)
+        pkgfile.group = Pkg.b2s(group)
+        linkto = Pkg.b2s(linkto)
+        pkgfile.linkto = linkto and os.path.normpath(linkto)
+        pkgfile.size = size
+        pkgfile.md5 = Pkg.b2s(md5)
+        pkgfile.inode = inode
+        pkgfile.lang = Pkg.b2s(lang)
+        pkgfile.magic = Pkg.b2s(magic) or ''
+        pkgfile.filecaps = Pkg.b2s(filecaps)
+        ret[name] = pkgfile
+
+    _files[pkg] = ret
+    return ret
+
+
+def readlink(pkg, pkgfile):
+    """Returns the PkgFile @pkgfile resolves to after following symbolic
+    links, None if that is not part of @pkg. Like Pkg.readlink(), without
+    the payload."""
+
+    entries = files(pkg)
+    seen = set()
+    while pkgfile and pkgfile.linkto:
+        if pkgfile.name in seen:
+            # symlink loop
+            return None
+        seen.add(pkgfile.name)
+        target = os.path.join(os.path.dirname(pkgfile.name), pkgfile.linkto)
+        pkgfile = entries.get(os.path.normpath(target))
+    return pkgfile
+
+
+def _flagged(pkg, flag):
+    """Returns the set of files of @pkg with the PkgFile property @flag."""
+
+    flagged = _flagged_files.setdefault(pkg, {})
+    if flag not in flagged:
+        flagged[flag] = frozenset(
+            f for f, pkgfile in files(pkg).items() if getattr(pkgfile, flag))
+    return flagged[flag]
+
+
+def ghost_files(pkg):
+    """Returns the set of %ghost files of @pkg."""
+
+    return _flagged(pkg, 'is_ghost')
+
+
+def doc_files(pkg):
+    """Returns the set of %doc files of @pkg."""
+
+    return _flagged(pkg, 'is_doc')
+
+
+def config_files(pkg):
+    """Returns the set of %config files of @pkg."""
+
+    return _flagged(pkg, 'is_config')
+
+
+def missingok_files(pkg):
+    """Returns the set of %config(missingok) files of @pkg."""
+
+    return _flagged(pkg, 'is_missingok')
+
+
+def _skip(pkg):
+    pass
+
+
+def register(check):
+    """Returns @check, disabled if HeaderOnly is set and it does not
+    declare that it can do without the payload. The checks built into
+    rpmlint are not affected."""
+
+    if HEADER_ONLY and getattr(check, 'needs_payload', True):
+        check.check = _skip
+    return check
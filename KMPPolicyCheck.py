@@ -9,9 +9,13 @@
 from Filter import *
 import AbstractCheck
 import Config
+import DependencyIndex
+import HeaderFiles
 
 
 class KMPPolicyCheck(AbstractCheck.AbstractCheck):
+    needs_payload = False
+
     def __init__(self):
         self.map = []
         AbstractCheck.AbstractCheck.__init__(self, "KMPPolicyCheck")
@@ -20,30 +24,24 @@ class KMPPolicyCheck(AbstractCheck.AbstractCheck):
         if pkg.isSource() or pkg.name.find('-kmp-') < 0:
             return
 
-        pkg_requires = set(map(lambda x: x[0].split('(')[0], pkg.requires()))
+        deps = DependencyIndex.get(pkg)
 
         kernel_flavour = "kernel-" + pkg.name.partition('-kmp-')[2]
 
         # verify that Requires: kernel_flavour is present
-        have_requires = False
-        for r in pkg_requires:
-            if r == kernel_flavour:
-                have_requires = True
-                break
-
-        if not have_requires:
+        if kernel_flavour not in deps.requires.base_names:
             printError(pkg, 'suse-policy-kmp-missing-requires', kernel_flavour)
 
         # verify that exactly one enhances on the kernel flavor is present
-        if len(pkg.enhances()) > 1:
-            printError(pkg, 'suse-policy-kmp-excessive-enhances', str(pkg.enhances()))
-        elif len(pkg.enhances()) < 1:
+        if len(deps.enhances) > 1:
+            printError(pkg, 'suse-policy-kmp-excessive-enhances', str(deps.enhances.deps))
+        elif len(deps.enhances) < 1:
             printError(pkg, 'suse-policy-kmp-missing-enhances', kernel_flavour)
 
         # check that only modalias supplements are present
         have_modalias = False
         have_proper_suppl = False
-        for s in pkg.supplements():
+        for s in deps.supplements:
             if s[0].startswith('modalias('):
                 have_modalias = True
                 continue
@@ -57,7 +55,7 @@ class KMPPolicyCheck(AbstractCheck.AbstractCheck):
             printError(pkg, 'suse-policy-kmp-missing-supplements')
 
 
-check = KMPPolicyCheck()
+check = HeaderFiles.register(KMPPolicyCheck())
 
 if Config.info:
     addDetails(
@@ -6,7 +6,6 @@
 # Purpose       : Verify shared library packaging policy rules
 #############################################################################
 
-import os
 import re
 import rpm
 import stat
@@ -14,9 +13,13 @@ import stat
 import AbstractCheck
 from BinariesCheck import BinaryInfo
 import Config
+import DependencyIndex
+import FileSniffer
+import HeaderFiles
 from Filter import addDetails
 from Filter import printError
 from Filter import printWarning
+import PayloadAccess
 import Pkg
 
 
@@ -298,10 +301,14 @@ def libname_from_soname(soname):
 
 
 class LibraryPolicyCheck(AbstractCheck.AbstractCheck):
+    needs_payload = True
+
     def __init__(self):
         AbstractCheck.AbstractCheck.__init__(self, "LibraryPolicyCheck")
         self.map = []
         self.strongly_versioned_re = re.compile(r'-[\d\.]+\.so$')
+        PayloadAccess.register("LibraryPolicyCheck", regex=r'\.so(?:\.|$)',
+                               file_type=FileSniffer.is_elf)
 
     def check(self, pkg):
         global _policy_legacy_exceptions
@@ -311,9 +318,10 @@ class LibraryPolicyCheck(AbstractCheck.AbstractCheck):
 
         # Only check unsuffixed lib* packages
         if pkg.name.endswith('-devel') or pkg.name.endswith('-doc'):
+            PayloadAccess.release(pkg, "LibraryPolicyCheck")
             return
 
-        files = pkg.files()
+        files = HeaderFiles.files(pkg)
 
         # Search for shared libraries in this package
         libs = set()
@@ -321,27 +329,26 @@ class LibraryPolicyCheck(AbstractCheck.AbstractCheck):
         libs_to_dir = dict()
         dirs = set()
         reqlibs = set()
-        pkg_requires = set(map(lambda x: str.split(x[0], '(')[0],
-                               pkg.requires()))
+        pkg_requires = DependencyIndex.get(pkg).requires.base_names
 
-        for f, pkgfile in files.items():
-            if '.so.' in f or f.endswith('.so'):
-                filename = pkg.dirName() + '/' + f
-                if stat.S_ISREG(files[f].mode) and pkgfile.magic.startswith('ELF '):
-                    bi = BinaryInfo(pkg, filename, f, False, True)
-                    libs_needed = libs_needed.union(bi.needed)
-                    if bi.soname != 0:
-                        lib_dir = '/'.join(f.split('/')[:-1])
-                        libs.add(bi.soname)
-                        libs_to_dir[bi.soname] = lib_dir
-                        dirs.add(lib_dir)
-                    if bi.soname in pkg_requires:
-                        # But not if the library is used by the pkg itself
-                        # This avoids program packages with their own
-                        # private lib
-                        # FIXME: we'd need to check if somebody else links
-                        # to this lib
-                        reqlibs.add(bi.soname)
+        for f in PayloadAccess.files(pkg, "LibraryPolicyCheck"):
+            if stat.S_ISREG(files[f].mode):
+                filename = PayloadAccess.path(pkg, f)
+                bi = BinaryInfo(pkg, filename, f, False, True)
+                libs_needed = libs_needed.union(bi.needed)
+                if bi.soname != 0:
+                    lib_dir = '/'.join(f.split('/')[:-1])
+                    libs.add(bi.soname)
+                    libs_to_dir[bi.soname] = lib_dir
+                    dirs.add(lib_dir)
+                if bi.soname in pkg_requires:
+                    # But not if the library is used by the pkg itself
+                    # This avoids program packages with their own
+                    # private lib
+                    # FIXME: we'd need to check if somebody else links
+                    # to this lib
+                    reqlibs.add(bi.soname)
+        PayloadAccess.release(pkg, "LibraryPolicyCheck")
 
         std_dirs = dirs.intersection((
             '/lib', '/lib64', '/usr/lib', '/usr/lib64',
@@ -404,13 +411,13 @@ class LibraryPolicyCheck(AbstractCheck.AbstractCheck):
 
         # Verify no non-lib stuff is in the package
         dirs = set()
-        for f in files:
-            if os.path.isdir(pkg.dirName() + f):
+        for f, pkgfile in files.items():
+            if stat.S_ISDIR(pkgfile.mode):
                 dirs.add(f)
 
         # Verify shared lib policy package doesn't have hard dependency on non-lib packages
         if std_lib_package:
-            for dep in pkg.requires():
+            for dep in DependencyIndex.get(pkg).requires:
                 if (dep[0].startswith('rpmlib(') or dep[0].startswith('config(')):
                     continue
                 if (dep[1] & (rpm.RPMSENSE_GREATER | rpm.RPMSENSE_EQUAL)) == rpm.RPMSENSE_EQUAL:
@@ -439,7 +446,7 @@ class LibraryPolicyCheck(AbstractCheck.AbstractCheck):
         map(lambda dir: printError(pkg, 'shlib-policy-nonversioned-dir', dir), cdirs)
 
 
-check = LibraryPolicyCheck()
+check = HeaderFiles.register(LibraryPolicyCheck())
 
 if Config.info:
     addDetails(
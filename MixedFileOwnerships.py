@@ -7,9 +7,12 @@
 
 from AbstractCheck import AbstractCheck
 from Filter import addDetails, printError
+import HeaderFiles
 
 
 class MixedFileOwnerships(AbstractCheck):
+    needs_payload = False
+
     def __init__(self):
         super().__init__("MixedFileOwnerships")
 
@@ -17,7 +20,7 @@ class MixedFileOwnerships(AbstractCheck):
         if pkg.isSource():
             return
 
-        files = pkg.files()
+        files = HeaderFiles.files(pkg)
         for path, info in files.items():
             parent = path.rpartition("/")[0]
             if parent not in files:
@@ -32,7 +35,7 @@ class MixedFileOwnerships(AbstractCheck):
                            "is stored in directory owned by different user", parent_owner)
 
 
-check = MixedFileOwnerships()
+check = HeaderFiles.register(MixedFileOwnerships())
 
 addDetails("file-parent-ownership-mismatch",
            """A file or directory is stored in a directory owned by another unprivileged user.
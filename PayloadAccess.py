@@ -0,0 +1,482 @@
+# vim: sw=4 ts=4 sts=4 et :
+#############################################################################
+# Purpose       : unpack only the payload files the loaded checks read
+#############################################################################
+
+# Checks reading file contents register the files they are interested in,
+# by path like with FileDispatcher and optionally by their type as told by
+# FileSniffer from the first bytes of the file. Instead of unpacking the
+# whole payload, only those files are taken out of the cpio archive of the
+# package, in a single pass. Their content is kept in memory, only members
+# larger than MemberMemoryLimit, or once MemoryBudget is used up by the files
+# of the package, are spilled to a temporary file. Checks read them with
+# open(), path() writes a file out for the checks that need to pass a path
+# on. Once done, checks release() their files, which are dropped as soon as
+# no check still has to read them. Checks only interested in the type of
+# some files register them with register_types() and ask file_type().
+#
+# As soon as a loaded check wants to read any file, see register_all(), the
+# payload is unpacked completely by rpmlint as before and the files are
+# taken from there, rpm2cpio is then never run. Note that this is the case
+# with the default set of checks: CheckBuildRoot and CheckBuildDate scan
+# about every file through ContentScanner. Selective reading only takes
+# effect with configurations that do not load them.
+
+import io
+import os
+import shutil
+import stat
+import subprocess
+import tempfile
+import weakref
+
+import Config
+import ElfFile
+import FileDispatcher
+import FileSniffer
+import HeaderFiles
+
+EXTRACT_DIR = Config.getOption('ExtractDir', tempfile.gettempdir())
+
+# files up to this size are kept in memory
+MEMBER_MEMORY_LIMIT = Config.getOption('PayloadAccess.MemberMemoryLimit',
+                                       4 * 1024 * 1024)
+
+# total size of the files of a package kept in memory
+MEMORY_BUDGET = Config.getOption('PayloadAccess.MemoryBudget',
+                                 64 * 1024 * 1024)
+
+# key -> (predicate on the FileSniffer.FileType of the files or None,
+#         predicate on the package and the PkgFile of the files or None)
+_interests = {}
+
+# set once a check reads arbitrary files
+_read_all = False
+
+# pkg -> Payload, None if the payload could not be read
+_payloads = weakref.WeakKeyDictionary()
+
+
+class PayloadError(Exception):
+    pass
+
+
+def register(key, prefixes=(), suffixes=(), regex=None, file_type=None,
+             select=None):
+    """Registers the files the check with the unique @key reads. Paths are
+    selected like with FileDispatcher.register(), @file_type is a predicate
+    the FileSniffer.FileType of the selected files has to satisfy. @select
+    is called with the package and the HeaderFiles entry of each selected
+    file and has to return True for the files the check wants."""
+
+    FileDispatcher.register(key, prefixes, suffixes, regex)
+    _interests[key] = (file_type, select)
+
+
+def _type_only(file_type):
+    return False
+
+
+def register_types(key, prefixes=(), suffixes=(), regex=None, select=None):
+    """Registers the files the check with the unique @key asks file_type()
+    about, without reading them. Of shared objects, only the headers and
+    the dynamic segment are read, to tell PIEs from libraries."""
+
+    register(key, prefixes, suffixes, regex, _type_only, select)
+
+
+def register_all():
+    """Declares that a loaded check reads the content of any file."""
+
+    global _read_all
+
+    _read_all = True
+
+
+def files(pkg, key):
+    """Returns the names of the files of @pkg registered as @key that are
+    not %ghost files."""
+
+    entries = HeaderFiles.files(pkg)
+    predicate, select = _interests[key]
+    return [f for f in FileDispatcher.files(pkg, key)
+            if not entries[f].is_ghost and
+            (not select or select(pkg, entries[f])) and
+            (not predicate or predicate(file_type(pkg, f)))]
+
+
+def _payload(pkg):
+    """Returns the Payload of @pkg, None if files have to be taken from the
+    completely unpacked payload."""
+
+    # once rpmlint unpacked the payload anyway, there is no point in
+    # reading parts of it again
+    if _read_all or getattr(pkg, 'extracted', False):
+        return None
+    return _read_payload(pkg)
+
+
+def _resolve(pkg, filename):
+    target = HeaderFiles.readlink(pkg, HeaderFiles.files(pkg).get(filename))
+    return target.name if target is not None else filename
+
+
+def _content(pkg, filename):
+    """Returns the Content of the file @filename of @pkg, None if it has to
+    be taken from the completely unpacked payload."""
+
+    payload = _payload(pkg)
+    if payload is None:
+        return None
+    return payload.contents.get(_resolve(pkg, filename))
+
+
+def file_type(pkg, filename):
+    """Returns the FileSniffer.FileType of the file @filename of @pkg."""
+
+    target = HeaderFiles.readlink(pkg, HeaderFiles.files(pkg).get(filename))
+    if target is None or target.is_ghost or not stat.S_ISREG(target.mode):
+        return FileSniffer.UNKNOWN
+
+    payload = _payload(pkg)
+    if payload is not None and target.name in payload.types:
+        return payload.types[target.name]
+
+    # not registered, take it from the completely unpacked payload
+    try:
+        with io.open(pkg.dirName() + target.name, 'rb') as fd:
+            return FileSniffer.identify_file(fd)
+    except (IOError, OSError):
+        return FileSniffer.UNKNOWN
+
+
+def path(pkg, filename):
+    """Returns the path of a file with the content of the file @filename
+    of @pkg, for checks that cannot do with open()."""
+
+    content = _content(pkg, filename)
+    if content is None:
+        # not registered, take it from the completely unpacked payload
+        return pkg.dirName() + filename
+
+    if content.path is None:
+        fd, content.path = _payloads[pkg].mkstemp(filename)
+        with io.open(fd, 'wb') as out:
+            out.write(content.data)
+    return content.path
+
+
+def open(pkg, filename, mode='rb'):
+    """Opens the file @filename of @pkg for reading."""
+
+    content = _content(pkg, filename)
+    if content is None:
+        return io.open(pkg.dirName() + filename, mode)
+    return content.open(mode)
+
+
+def release(pkg, key, filename=None):
+    """Declares that the check with @key is done reading the file @filename
+    of @pkg, or all of its files if not given. Files no check still has to
+    read are dropped, reading them again unpacks the payload completely."""
+
+    payload = _payloads.get(pkg)
+    if payload is None:
+        return
+    for content in set(payload.contents.values()):
+        if filename is None:
+            content.readers = set(r for r in content.readers if r[0] != key)
+        else:
+            content.readers.discard((key, filename))
+        if not content.readers:
+            payload.free(content)
+
+
+def _selection(pkg):
+    """Returns two dictionaries mapping the files registered by any check
+    to the (key, filename) pairs they were selected as. The first holds
+    the files registered for reading, the second those registered with a
+    file type predicate, as (key, filename, predicate). Symbolic links
+    among them stand for their targets."""
+
+    entries = HeaderFiles.files(pkg)
+    wanted = {}
+    typed = {}
+    for key, (predicate, select) in _interests.items():
+        for f in FileDispatcher.files(pkg, key):
+            target = HeaderFiles.readlink(pkg, entries[f])
+            if entries[f].is_ghost or target is None:
+                continue
+            if select and not select(pkg, entries[f]):
+                continue
+            if predicate is None:
+                wanted.setdefault(target.name, set()).add((key, f))
+            else:
+                typed.setdefault(target.name, []).append(
+                    (key, f, predicate))
+    return wanted, typed
+
+
+class Content(object):
+    """The content of a file of the payload, either in memory as data or
+    in the temporary file at path. readers holds the (key, filename) pairs
+    of the checks that still have to read it."""
+
+    def __init__(self, data=None, path=None):
+        self.data = data
+        self.path = path
+        self.readers = set()
+
+    def open(self, mode='rb'):
+        if self.data is None:
+            return io.open(self.path, mode)
+        fd = io.BytesIO(self.data)
+        return fd if 'b' in mode else io.TextIOWrapper(fd)
+
+
+class Payload(object):
+    """The registered files read from the payload of a package, contents
+    mapping their names to Content objects and types to FileSniffer.FileType
+    tuples."""
+
+    def __init__(self, pkg):
+        self.prefix = 'rpmlint.%s.' % os.path.basename(pkg.filename)
+        self.directory = None
+        self.contents = {}
+        self.types = {}
+        # size of the contents kept in memory
+        self.in_memory = 0
+
+    def mkstemp(self, filename):
+        """Returns the file descriptor and the path of a new temporary file
+        for @filename, removed together with this Payload."""
+
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix=self.prefix,
+                                              dir=EXTRACT_DIR)
+            weakref.finalize(self, shutil.rmtree, self.directory, True)
+        return tempfile.mkstemp(suffix='-' + os.path.basename(filename),
+                                dir=self.directory)
+
+    def store(self, filename, head, member):
+        """Returns a Content for the cpio @member of @filename, of which
+        @head has already been read. It is kept in memory as long as it
+        fits MEMBER_MEMORY_LIMIT and the MEMORY_BUDGET of the package."""
+
+        if member.size <= MEMBER_MEMORY_LIMIT and \
+                self.in_memory + member.size <= MEMORY_BUDGET:
+            self.in_memory += member.size
+            return Content(data=head + member.read())
+
+        fd, path = self.mkstemp(filename)
+        with io.open(fd, 'wb') as out:
+            out.write(head)
+            while member.left:
+                out.write(member.read(1024 * 1024))
+        return Content(path=path)
+
+    def free(self, content):
+        """Drops @content from memory and disk."""
+
+        for name in [n for n, c in self.contents.items() if c is content]:
+            del self.contents[name]
+        if content.data is not None:
+            self.in_memory -= len(content.data)
+        if content.path is not None:
+            try:
+                os.remove(content.path)
+            except OSError:
+                pass
+        content.data = content.path = None
+
+    def read(self, stream, wanted, typed):
+        """Takes the files named in @wanted out of the cpio archive in
+        @stream, together with those in @typed whose type satisfies any of
+        their predicates, see _selection(). The types of both are kept in
+        types."""
+
+        # hardlinked files carry their content with the last link only
+        links = {}
+        for member in cpio_members(stream):
+            if not stat.S_ISREG(member.mode):
+                continue
+            names = [member.name]
+            if member.nlink > 1:
+                links.setdefault(member.inode, []).append(member.name)
+                if not member.size:
+                    continue
+                names = links.pop(member.inode)
+
+            names = [n for n in names if n in wanted or n in typed]
+            if not names:
+                continue
+            head = member.read(FileSniffer.HEAD_SIZE)
+            file_type = FileSniffer.identify(head)
+
+            readers = self.readers(names, wanted, typed, file_type)
+            if readers:
+                content = self.store(names[0], head, member)
+                content.readers = readers
+                for n in names:
+                    self.contents[n] = content
+                if FileSniffer.is_elf(file_type):
+                    with content.open() as fd:
+                        file_type = FileSniffer.identify_file(fd)
+            else:
+                file_type = _identify_elf(head, member)
+
+            for n in names:
+                self.types[n] = file_type
+
+        # hardlinked empty files
+        for names in links.values():
+            file_type = FileSniffer.identify(b'')
+            for n in names:
+                if n in wanted or n in typed:
+                    self.types[n] = file_type
+                    content = Content(data=b'')
+                    content.readers = self.readers([n], wanted, typed,
+                                                   file_type)
+                    if content.readers:
+                        self.contents[n] = content
+
+    @staticmethod
+    def readers(names, wanted, typed, file_type):
+        """Returns the (key, filename) pairs the files @names of type
+        @file_type are read as."""
+
+        ret = set()
+        for n in names:
+            ret.update(wanted.get(n, ()))
+            ret.update((key, f) for key, f, predicate in typed.get(n, ())
+                       if predicate(file_type))
+        return ret
+
+
+def _identify_elf(head, member):
+    """Returns the FileSniffer.FileType of the cpio @member starting with
+    @head, which has been read already. Of shared objects, the dynamic
+    segment is read as well, skipping everything in between."""
+
+    file_type = FileSniffer.identify(head)
+    dynamic = FileSniffer.dynamic_segment(head)
+    if dynamic is None:
+        return file_type
+    offset, size = dynamic
+    end = offset + size
+    if end <= len(head) or end > member.size:
+        return file_type
+
+    if offset > len(head):
+        member.skip(offset - len(head))
+        data = member.read(size)
+    else:
+        data = head[offset:] + member.read(end - len(head))
+    view = ElfFile.SparseView(member.size, ((0, head), (offset, data)))
+    return FileSniffer.identify_elf(view)
+
+
+def _read_payload(pkg):
+    # the payload gets unpacked completely anyway, do not decompress it a
+    # second time
+    if _read_all:
+        return None
+    if pkg in _payloads:
+        return _payloads[pkg]
+
+    payload = Payload(pkg)
+    wanted, typed = _selection(pkg)
+    if wanted or typed:
+        try:
+            proc = subprocess.Popen(['rpm2cpio', pkg.filename],
+                                    stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL)
+            with proc.stdout:
+                payload.read(proc.stdout, wanted, typed)
+            proc.wait()
+        except (OSError, PayloadError):
+            payload = None
+
+    _payloads[pkg] = payload
+    return payload
+
+
+# cpio "new ASCII" format, see cpio(5)
+_CPIO_MAGICS = (b'070701', b'070702')
+_CPIO_HEADER_SIZE = 110
+_CPIO_TRAILER = 'TRAILER!!!'
+
+
+def _read_exactly(stream, size):
+    data = stream.read(size)
+    # pipes might return less than asked for
+    while len(data) < size:
+        more = stream.read(size - len(data))
+        if not more:
+            raise PayloadError('truncated cpio archive')
+        data += more
+    return data
+
+
+def _skip(stream, size):
+    while size > 0:
+        size -= len(_read_exactly(stream, min(size, 1024 * 1024)))
+
+
+def _pad(size):
+    return (4 - size % 4) % 4
+
+
+class CpioMember(object):
+    """A member of a cpio archive. The name is absolute, without the
+    leading '.', the inode a (device major, device minor, inode) tuple.
+    The content can be read once, while the archive is at this member."""
+
+    def __init__(self, stream, name, mode, nlink, inode, size):
+        self.stream = stream
+        self.name = name
+        self.mode = mode
+        self.nlink = nlink
+        self.inode = inode
+        self.size = size
+        self.left = size
+
+    def read(self, size=-1):
+        if size < 0 or size > self.left:
+            size = self.left
+        data = _read_exactly(self.stream, size)
+        self.left -= size
+        return data
+
+    def skip(self, size):
+        size = min(size, self.left)
+        _skip(self.stream, size)
+        self.left -= size
+
+
+def cpio_members(stream):
+    """Yields a CpioMember for each member of the cpio archive read from
+    @stream in a single forward pass."""
+
+    while True:
+        header = _read_exactly(stream, _CPIO_HEADER_SIZE)
+        if header[:6] not in _CPIO_MAGICS:
+            raise PayloadError('unsupported cpio format')
+        fields = [int(header[6 + 8 * i:14 + 8 * i], 16) for i in range(13)]
+        ino, mode, _, _, nlink, _, size, devmajor, devminor, _, _, \
+            namesize, _ = fields
+        name = _read_exactly(stream, namesize)[:-1]
+        name = name.decode('utf-8', 'surrogateescape')
+        _skip(stream, _pad(_CPIO_HEADER_SIZE + namesize))
+        if name == _CPIO_TRAILER:
+            return
+
+        if name.startswith('./'):
+            name = name[1:]
+        elif not name.startswith('/'):
+            name = '/' + name
+
+        member = CpioMember(stream, name, mode, nlink,
+                            (devmajor, devminor, ino), size)
+        yield member
+        _skip(stream, member.left + _pad(size))
@@ -0,0 +1,180 @@
+# vim: sw=4 ts=4 sts=4 et :
+#############################################################################
+# Purpose       : on-disk cache of per-file check results by file digest
+#############################################################################
+
+# The same file content shows up in many packages and in every rebuild of
+# a package. Checks whose verdict on a file only depends on its content
+# can keep their findings in this cache, keyed by the check, a hash of
+# everything else the verdict depends on and the digest of the file from
+# the package header. A cached verdict is reported again without the
+# payload file ever being opened.
+#
+# The cache is an SQLite database, enabled by setting ResultCache.File. It
+# is kept below ResultCache.MaxSize bytes by dropping the least recently
+# used entries.
+
+import atexit
+import hashlib
+import json
+import sqlite3
+import time
+
+import Config
+import Filter
+
+CACHE_FILE = Config.getOption('ResultCache.File', None)
+MAX_SIZE = Config.getOption('ResultCache.MaxSize', 64 * 1024 * 1024)
+
+# changes written in one transaction
+COMMIT_INTERVAL = 1000
+
+# approximate per entry overhead besides the findings
+ENTRY_OVERHEAD = 128
+
+_PRINT = {
+    'E': Filter.printError,
+    'W': Filter.printWarning,
+    'I': Filter.printInfo,
+}
+
+_db = None
+_total_size = 0
+_pending = 0
+
+
+def _open():
+    global _db, _total_size
+
+    if _db is None:
+        _db = sqlite3.connect(CACHE_FILE, timeout=60)
+        _db.execute('''CREATE TABLE IF NOT EXISTS results (
+                           checkname TEXT, config TEXT, digest TEXT,
+                           findings TEXT, size INTEGER, atime REAL,
+                           PRIMARY KEY (checkname, config, digest))''')
+        _db.execute('CREATE INDEX IF NOT EXISTS results_atime '
+                    'ON results (atime)')
+        _total_size = _db.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+    return _db
+
+
+def _close():
+    global _db
+
+    if _db is not None:
+        _evict()
+        _db.commit()
+        _db.close()
+        _db = None
+
+
+atexit.register(_close)
+
+
+def _changed():
+    global _pending
+
+    _pending += 1
+    if _pending >= COMMIT_INTERVAL:
+        _evict()
+        _db.commit()
+        _pending = 0
+
+
+def _evict():
+    """Drops the least recently used entries until the cache is below 90%
+    of MAX_SIZE."""
+
+    global _total_size
+
+    while _total_size > MAX_SIZE:
+        rows = _db.execute('SELECT rowid, size FROM results '
+                           'ORDER BY atime LIMIT 100').fetchall()
+        if not rows:
+            _total_size = 0
+            break
+        for rowid, size in rows:
+            _db.execute('DELETE FROM results WHERE rowid = ?', (rowid,))
+            _total_size -= size
+            if _total_size <= MAX_SIZE * 0.9:
+                return
+
+
+class ResultCache(object):
+    """Cached findings of the check @name. @version has to change whenever
+    the check changes what it reports for a given file content.
+
+    Findings are lists of (level, tag, details...) tuples, level being one
+    of 'E', 'W' or 'I'. The file name is left out, report() adds it as the
+    first detail."""
+
+    def __init__(self, name, version):
+        self.name = name
+        self.version = version
+
+    def _key(self, pkgfile, config):
+        digest = pkgfile.md5
+        if not CACHE_FILE or not digest:
+            return None
+        config = hashlib.sha1(
+            repr((self.version, config)).encode('utf-8')).hexdigest()
+        return (self.name, config, digest)
+
+    def lookup(self, pkgfile, config=()):
+        """Returns the cached findings for the content of @pkgfile, None if
+        there are none. @config holds whatever else the findings depend
+        on."""
+
+        key = self._key(pkgfile, config)
+        if key is None:
+            return None
+
+        db = _open()
+        row = db.execute('SELECT findings FROM results WHERE checkname = ? '
+                         'AND config = ? AND digest = ?', key).fetchone()
+        if row is None:
+            return None
+
+        db.execute('UPDATE results SET atime = ? WHERE checkname = ? '
+                   'AND config = ? AND digest = ?', (time.time(),) + key)
+        _changed()
+        return [tuple(f) for f in json.loads(row[0])]
+
+    def store(self, pkgfile, findings, config=()):
+        global _total_size
+
+        key = self._key(pkgfile, config)
+        if key is None:
+            return
+
+        db = _open()
+        data = json.dumps(findings)
+        size = len(data) + ENTRY_OVERHEAD
+        old = db.execute('SELECT size FROM results WHERE checkname = ? '
+                         'AND config = ? AND digest = ?', key).fetchone()
+        if old:
+            _total_size -= old[0]
+        db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)',
+                   key + (data, size, time.time()))
+        _total_size += size
+        _changed()
+
+    def get(self, pkgfile, compute, config=()):
+        """Returns the findings for @pkgfile, from the cache if possible,
+        from calling @compute() otherwise. @compute() returns None if the
+        file could not be checked, which is not cached and reported as no
+        findings."""
+
+        findings = self.lookup(pkgfile, config)
+        if findings is None:
+            findings = compute()
+            if findings is None:
+                return []
+            self.store(pkgfile, findings, config)
+        return findings
+
+
+def report(pkg, filename, findings):
+    for level, tag, *details in findings:
+        _PRINT[level](pkg, tag, filename, *details)
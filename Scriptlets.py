@@ -0,0 +1,254 @@
+# vim: sw=4 ts=4 sts=4 et :
+#############################################################################
+# Purpose       : parsed scriptlets of a package, shared by the checks
+#############################################################################
+
+# Several checks look for particular commands in the scriptlets of a
+# package. The scriptlets of a package are decoded and split into commands
+# once, on first use, and the commands are indexed for the lookups the
+# checks need.
+
+import os
+import re
+import shlex
+import weakref
+
+import Pkg
+import rpm
+
+# scriptlet name -> (body tag, interpreter tag)
+SCRIPTLETS = {
+    'pretrans': (rpm.RPMTAG_PRETRANS, rpm.RPMTAG_PRETRANSPROG),
+    'pre': (rpm.RPMTAG_PREIN, rpm.RPMTAG_PREINPROG),
+    'post': (rpm.RPMTAG_POSTIN, rpm.RPMTAG_POSTINPROG),
+    'preun': (rpm.RPMTAG_PREUN, rpm.RPMTAG_PREUNPROG),
+    'postun': (rpm.RPMTAG_POSTUN, rpm.RPMTAG_POSTUNPROG),
+    'posttrans': (rpm.RPMTAG_POSTTRANS, rpm.RPMTAG_POSTTRANSPROG),
+    'verify': (rpm.RPMTAG_VERIFYSCRIPT, rpm.RPMTAG_VERIFYSCRIPTPROG),
+}
+
+# tokens separating commands
+SEPARATORS = frozenset((';', ';;', '&', '&&', '|', '||', '(', ')'))
+
+# characters of redirection operators
+REDIRECT_CHARS = frozenset('<>&|')
+
+# reserved words that may precede the first word of a command
+RESERVED = frozenset(('!', '{', '}', 'do', 'done', 'elif', 'else', 'fi',
+                      'if', 'then', 'until', 'while'))
+
+# variable assignments that may precede the first word of a command
+_assignment_re = re.compile(r'[A-Za-z_][A-Za-z0-9_]*=')
+
+
+class Scriptlet(object):
+    """A single scriptlet. @text is its body, or the interpreter if it has
+    no body, like for -p /sbin/ldconfig."""
+
+    def __init__(self, text):
+        self.text = text or ''
+        # list of commands, each a list of words with quotes removed
+        self.commands = []
+        # the text of whole line comments
+        self.comments = []
+        # every word of every command and every redirection target
+        self.tokens = set()
+
+        for line in self.text.replace('\\\n', '').split('\n'):
+            if line.lstrip().startswith('#'):
+                self.comments.append(line.lstrip()[1:].strip())
+                continue
+            self._add_line(line)
+
+    def __bool__(self):
+        return bool(self.text)
+
+    def _add_line(self, line):
+        lexer = shlex.shlex(line, posix=True, punctuation_chars=True)
+        lexer.whitespace_split = True
+        try:
+            words = list(lexer)
+        except ValueError:
+            # quotes spanning lines, take it as it is
+            words = line.split()
+
+        command = []
+        redirect = False
+        for word in words + [';']:
+            if word in SEPARATORS:
+                if command:
+                    self.commands.append(command)
+                command = []
+            elif set(word) <= REDIRECT_CHARS:
+                # 2>/dev/null, the file descriptor and target are no
+                # arguments of the command
+                if command and command[-1].isdigit():
+                    command.pop()
+                redirect = True
+            elif redirect:
+                # but files created by : > /some/file are of interest
+                self.tokens.add(word)
+                redirect = False
+            elif command or word not in RESERVED:
+                command.append(word)
+                self.tokens.add(word)
+                # --option=/some/path
+                if '=' in word:
+                    self.tokens.add(word.split('=', 1)[1])
+
+    def invocations(self, program, *subcommand):
+        """Yields the arguments following @program and the @subcommand
+        words in each command running @program. Only the first word of a
+        command after any variable assignments is taken as the program, not
+        an argument like in [ -x /usr/bin/chkstat ]."""
+
+        n = len(subcommand)
+        for command in self.commands:
+            i = 0
+            while i < len(command) and _assignment_re.match(command[i]):
+                i += 1
+            if i < len(command) and \
+                    os.path.basename(command[i]) == program and \
+                    tuple(command[i + 1:i + 1 + n]) == subcommand:
+                yield command[i + 1 + n:]
+
+    def arguments(self, program, *subcommand):
+        """Returns the set of non-option arguments passed to @program after
+        the @subcommand words."""
+
+        ret = set()
+        for args in self.invocations(program, *subcommand):
+            ret.update(arg for arg in args if not arg.startswith('-'))
+        return ret
+
+
+class Scriptlets(object):
+    """The scriptlets of a package with indexes of the commands in them."""
+
+    def __init__(self, pkg):
+        # a weak reference, the package is the key of the cache holding
+        # this and would never be released otherwise
+        self.pkg = weakref.proxy(pkg)
+        self.m_scriptlets = {}
+        self.m_indexes = {}
+
+    def __getitem__(self, name):
+        if name not in self.m_scriptlets:
+            body, prog = SCRIPTLETS[name]
+            text = Pkg.b2s(self.pkg[body]) or self.pkg.scriptprog(prog)
+            self.m_scriptlets[name] = Scriptlet(text)
+        return self.m_scriptlets[name]
+
+    def body(self, name):
+        """Returns the scriptlet @name, without the interpreter fallback."""
+
+        key = (name, 'body')
+        if key not in self.m_scriptlets:
+            self.m_scriptlets[key] = Scriptlet(
+                Pkg.b2s(self.pkg[SCRIPTLETS[name][0]]))
+        return self.m_scriptlets[key]
+
+    def _index(self, key, build):
+        if key not in self.m_indexes:
+            self.m_indexes[key] = build()
+        return self.m_indexes[key]
+
+    def service_units(self, macro):
+        """Returns the set of units handled by the expansion of the systemd
+        @macro, one of service_add_pre, service_add_post, service_del_preun
+        and service_del_postun."""
+
+        def build():
+            units = set()
+            if macro in ('service_add_pre', 'service_add_post'):
+                script = self['pre' if macro == 'service_add_pre' else 'post']
+                for command in script.commands:
+                    if command[:3] == ['for', 'service', 'in']:
+                        units.update(command[3:])
+            elif macro == 'service_del_preun':
+                units.update(self['preun'].arguments(
+                    'systemctl', '--no-reload', 'disable'))
+            elif macro == 'service_del_postun':
+                script = self['postun']
+                units.update(script.arguments('systemctl', 'try-restart'))
+                for comment in script.comments:
+                    if comment.startswith('Restart of '):
+                        units.update(comment.split()[2:])
+            else:
+                raise KeyError(macro)
+            return set(os.path.basename(u) for u in units)
+
+        return self._index(('service_units', macro), build)
+
+    def alternatives(self):
+        """Returns the set of link names set up by update-alternatives
+        --install, including the --slave ones, in %pre, %post and
+        %posttrans."""
+
+        def build():
+            links = set()
+            for name in ('post', 'pre', 'posttrans'):
+                for args in self.body(name).invocations('update-alternatives'):
+                    if '--install' not in args:
+                        continue
+                    paths = [arg for arg in args if not arg.startswith('--')]
+                    if paths:
+                        links.add(paths[0])
+                    for i, arg in enumerate(args[:-1]):
+                        if arg == '--slave':
+                            links.add(args[i + 1])
+            return links
+
+        return self._index('alternatives', build)
+
+    def tmpfiles_created(self):
+        """Returns the set of base names of the tmpfiles.d files passed to
+        systemd-tmpfiles --create in %pre and %post."""
+
+        def build():
+            names = set()
+            for name in ('pre', 'post'):
+                for args in self.body(name).invocations('systemd-tmpfiles'):
+                    if '--create' in args:
+                        names.update(os.path.basename(arg) for arg in args
+                                     if not arg.startswith('-'))
+            return names
+
+        return self._index('tmpfiles_created', build)
+
+    def chkstat_paths(self, name, *options):
+        """Returns the set of paths passed to chkstat, together with all of
+        @options, in the scriptlet @name. Trailing slashes are removed."""
+
+        def build():
+            paths = set()
+            for args in self[name].invocations('chkstat'):
+                if all(option in args for option in options):
+                    paths.update(arg.rstrip('/') or '/' for arg in args
+                                 if not arg.startswith('-'))
+            return paths
+
+        return self._index(('chkstat_paths', name) + options, build)
+
+    def tokens(self, *names):
+        """Returns the set of words used in any of the scriptlets @names."""
+
+        def build():
+            ret = set()
+            for name in names:
+                ret |= self.body(name).tokens
+            return ret
+
+        return self._index(('tokens',) + names, build)
+
+
+# pkg -> Scriptlets
+_scriptlets = weakref.WeakKeyDictionary()
+
+
+def get(pkg):
+    """Returns the Scriptlets of @pkg."""
+
+    if pkg not in _scriptlets:
+        _scriptlets[pkg] = Scriptlets(pkg)
+    return _scriptlets[pkg]
@@ -0,0 +1,574 @@
+# vim: sw=4 ts=4 sts=4 et :
+#############################################################################
+# Purpose       : in-process POSIX shell syntax checker
+#############################################################################
+
+# A tokenizer and recursive descent parser for the POSIX shell command
+# language, as far as it is needed to tell whether dash would reject a
+# script with a syntax error. Nothing is evaluated, words are only split
+# off, with their quoting, expansions and command substitutions checked
+# for being complete. The parser accepts whenever it is in doubt, so a
+# script it rejects is very likely rejected by dash as well.
+
+import collections
+import re
+
+# reserved words, only recognized as the first word of a command
+RESERVED = frozenset(('!', '{', '}', 'case', 'do', 'done', 'elif', 'else',
+                      'esac', 'fi', 'for', 'if', 'in', 'then', 'until',
+                      'while'))
+
+# reserved words ending a compound list
+_LIST_END = frozenset(('}', 'do', 'done', 'elif', 'else', 'esac', 'fi',
+                       'then'))
+
+# longest first
+OPERATORS = ('<<-', '&&', '||', ';;', '<<', '>>', '<&', '>&', '<>', '>|',
+             ';', '&', '|', '(', ')', '<', '>')
+
+REDIRECTIONS = frozenset(('<', '>', '>>', '<&', '>&', '<>', '>|', '<<',
+                          '<<-'))
+
+_BLANKS = re.compile(r'(?:[ \t]|\\\n)*')
+_PLAIN = re.compile(r'[^ \t\n;&|<>()\'"\\`$]+')
+_DQUOTED = re.compile(r'[^"\\`$]+')
+_HEREDOC = re.compile(r'[^\\`$]+')
+_BRACED = re.compile(r'[^}\'"\\`$]+')
+_ARITH = re.compile(r'[^()\'"\\`$]+')
+_PARAMETER = re.compile(r'#?(?:[A-Za-z_][A-Za-z0-9_]*|[0-9]+|[@*#?$!-])')
+_NAME = re.compile(r'[A-Za-z_][A-Za-z0-9_]*$')
+_UNQUOTE = re.compile(r'\\(.)|[\'"]', re.DOTALL)
+
+# kind is one of 'word', 'ionumber', 'op', 'newline' or 'eof', pos is the
+# offset of the token in the text
+Token = collections.namedtuple('Token', ('kind', 'value', 'pos'))
+
+
+class ShellSyntaxError(Exception):
+    pass
+
+
+class Lexer(object):
+    def __init__(self, text, first_line=1):
+        self.text = text
+        self.pos = 0
+        self.first_line = first_line
+        # (delimiter, strip tabs) of the here-documents starting with the
+        # next line
+        self.heredocs = []
+
+    def line(self, pos):
+        return self.first_line + self.text.count('\n', 0, pos)
+
+    def error(self, pos, msg):
+        raise ShellSyntaxError("line {}: {}".format(self.line(pos), msg))
+
+    def add_heredoc(self, word, strip_tabs):
+        delimiter = _UNQUOTE.sub(r'\1', word)
+        self.heredocs.append((delimiter, strip_tabs, delimiter != word))
+
+    def next_token(self):
+        text = self.text
+        while True:
+            self.pos = _BLANKS.match(text, self.pos).end()
+            if self.pos >= len(text):
+                return Token('eof', None, self.pos)
+
+            c = text[self.pos]
+            if c == '#':
+                end = text.find('\n', self.pos)
+                self.pos = end if end >= 0 else len(text)
+                continue
+            break
+
+        start = self.pos
+        if c == '\n':
+            self.pos += 1
+            self._read_heredocs()
+            return Token('newline', '\n', start)
+
+        for op in OPERATORS:
+            if text.startswith(op, start):
+                self.pos += len(op)
+                return Token('op', op, start)
+
+        word = self._word()
+        if word.isdigit() and text[self.pos:self.pos + 1] in ('<', '>'):
+            return Token('ionumber', word, start)
+        return Token('word', word, start)
+
+    def _read_heredocs(self):
+        text = self.text
+        for delimiter, strip_tabs, quoted in self.heredocs:
+            start = self.pos
+            while self.pos < len(text):
+                end = text.find('\n', self.pos)
+                if end < 0:
+                    end = len(text)
+                line = text[self.pos:end]
+                self.pos = end + 1
+                if strip_tabs:
+                    line = line.lstrip('\t')
+                if line == delimiter:
+                    break
+            if not quoted:
+                # expansions are still parsed in unquoted here-documents
+                body = Lexer(text[start:self.pos], self.line(start))
+                body._here_document()
+        self.heredocs = []
+
+    def _word(self):
+        text = self.text
+        start = self.pos
+        while self.pos < len(text):
+            m = _PLAIN.match(text, self.pos)
+            if m:
+                self.pos = m.end()
+                continue
+
+            c = text[self.pos]
+            if c in ' \t\n;&|<>()':
+                break
+            elif c == '\\':
+                self.pos += 2
+            elif c == "'":
+                self._single_quoted()
+            elif c == '"':
+                self._double_quoted()
+            elif c == '`':
+                self._backquoted(False)
+            else:
+                self._dollar(False)
+
+        self.pos = min(self.pos, len(text))
+        return text[start:self.pos]
+
+    def _single_quoted(self):
+        end = self.text.find("'", self.pos + 1)
+        if end < 0:
+            self.error(self.pos, "unterminated quoted string")
+        self.pos = end + 1
+
+    def _double_quoted(self):
+        text = self.text
+        start = self.pos
+        self.pos += 1
+        while True:
+            m = _DQUOTED.match(text, self.pos)
+            if m:
+                self.pos = m.end()
+            if self.pos >= len(text):
+                self.error(start, "unterminated quoted string")
+
+            c = text[self.pos]
+            if c == '"':
+                self.pos += 1
+                return
+            elif c == '\\':
+                self.pos += 2
+            elif c == '`':
+                self._backquoted(True)
+            else:
+                self._dollar(True)
+
+    def _here_document(self):
+        text = self.text
+        while True:
+            m = _HEREDOC.match(text, self.pos)
+            if m:
+                self.pos = m.end()
+            if self.pos >= len(text):
+                return
+
+            c = text[self.pos]
+            if c == '\\':
+                self.pos += 2
+            elif c == '`':
+                self._backquoted(True)
+            else:
+                self._dollar(True)
+
+    def _backquoted(self, in_dquote):
+        text = self.text
+        start = self.pos
+        escapable = '\\`$"' if in_dquote else '\\`$'
+        body = []
+        self.pos += 1
+        while True:
+            if self.pos >= len(text):
+                self.error(start, "EOF in backquote substitution")
+            c = text[self.pos]
+            if c == '`':
+                self.pos += 1
+                break
+            if c == '\\' and text[self.pos + 1:self.pos + 2] in escapable:
+                self.pos += 1
+                c = text[self.pos]
+            body.append(c)
+            self.pos += 1
+
+        Parser(Lexer(''.join(body), self.line(start))).parse_backquoted()
+
+    def _dollar(self, in_dquote):
+        text = self.text
+        start = self.pos
+        nxt = text[self.pos + 1:self.pos + 2]
+        if nxt == '{':
+            self.pos += 2
+            # like dash, take whatever follows the parameter as the type of
+            # the expansion, even if it is not a valid one, and whatever
+            # comes first as the parameter if there is no valid one
+            m = _PARAMETER.match(text, self.pos)
+            if m:
+                self.pos = m.end()
+                # patterns are parsed as if unquoted
+                if text[self.pos:self.pos + 1] in ('%', '#'):
+                    in_dquote = False
+            if text[self.pos:self.pos + 1] != '}':
+                self.pos += 1
+            self._balanced(start, _BRACED, '}', in_dquote, "missing '}'")
+        elif nxt == '(' and text[self.pos + 2:self.pos + 3] == '(':
+            self.pos += 3
+            self._arithmetic(start)
+        elif nxt == '(':
+            self.pos += 2
+            Parser(self).parse_command_substitution()
+        elif nxt == '$':
+            self.pos += 2
+        else:
+            self.pos += 1
+
+    def _balanced(self, start, plain, close, in_dquote, msg):
+        text = self.text
+        while True:
+            m = plain.match(text, self.pos)
+            if m:
+                self.pos = m.end()
+            if self.pos >= len(text):
+                self.error(start, msg)
+
+            c = text[self.pos]
+            if c == close:
+                self.pos += 1
+                return
+            elif c == '\\':
+                self.pos += 2
+            elif c == "'":
+                if in_dquote:
+                    self.pos += 1
+                else:
+                    self._single_quoted()
+            elif c == '"':
+                self._double_quoted()
+            elif c == '`':
+                self._backquoted(in_dquote)
+            else:
+                self._dollar(in_dquote)
+
+    def _arithmetic(self, start):
+        text = self.text
+        depth = 0
+        while True:
+            m = _ARITH.match(text, self.pos)
+            if m:
+                self.pos = m.end()
+            if self.pos >= len(text):
+                self.error(start, "missing '))'")
+
+            c = text[self.pos]
+            if c == '(':
+                depth += 1
+                self.pos += 1
+            elif c == ')':
+                self.pos += 1
+                if depth:
+                    depth -= 1
+                elif text[self.pos:self.pos + 1] == ')':
+                    self.pos += 1
+                    return
+            elif c == '\\':
+                self.pos += 2
+            elif c == "'":
+                self._single_quoted()
+            elif c == '"':
+                self._double_quoted()
+            elif c == '`':
+                self._backquoted(False)
+            else:
+                self._dollar(False)
+
+
+class Parser(object):
+    def __init__(self, lexer):
+        self.lexer = lexer
+        self.tok = None
+
+    def peek(self):
+        # tokens are only read on demand, the lexer needs to know about a
+        # here-document before it reads the line break following it
+        if self.tok is None:
+            self.tok = self.lexer.next_token()
+        return self.tok
+
+    def advance(self):
+        tok = self.peek()
+        self.tok = None
+        return tok
+
+    def error(self, tok, expecting=None):
+        if tok.kind == 'eof':
+            msg = "end of file unexpected"
+        elif tok.kind == 'newline':
+            msg = "newline unexpected"
+        else:
+            msg = '"{}" unexpected'.format(tok.value)
+        if expecting:
+            msg += ' (expecting "{}")'.format(expecting)
+        self.lexer.error(tok.pos, msg)
+
+    def is_op(self, *ops):
+        tok = self.peek()
+        return tok.kind == 'op' and tok.value in ops
+
+    def is_reserved(self, *words):
+        tok = self.peek()
+        return tok.kind == 'word' and tok.value in words
+
+    def expect_op(self, op):
+        if not self.is_op(op):
+            self.error(self.peek(), op)
+        self.advance()
+
+    def expect_reserved(self, word):
+        if not self.is_reserved(word):
+            self.error(self.peek(), word)
+        self.advance()
+
+    def linebreak(self):
+        while self.peek().kind == 'newline':
+            self.advance()
+
+    def parse(self):
+        """Parses a complete script, raises ShellSyntaxError on the first
+        syntax error."""
+
+        self.linebreak()
+        while self.peek().kind != 'eof':
+            self.and_or()
+            if self.is_op(';', '&'):
+                self.advance()
+            elif self.peek().kind not in ('newline', 'eof'):
+                self.error(self.peek())
+            self.linebreak()
+
+    def parse_command_substitution(self):
+        self.linebreak()
+        if not self.is_op(')'):
+            self.compound_list()
+        self.expect_op(')')
+
+    def parse_backquoted(self):
+        # like dash, stop at the first token not continuing the list
+        self.linebreak()
+        while not self.ends_list():
+            self.and_or()
+            if self.is_op(';', '&'):
+                self.advance()
+            elif self.peek().kind != 'newline':
+                break
+            self.linebreak()
+
+    def ends_list(self):
+        tok = self.peek()
+        return (tok.kind == 'eof' or
+                (tok.kind == 'op' and tok.value in (')', ';;')) or
+                (tok.kind == 'word' and tok.value in _LIST_END))
+
+    def compound_list(self):
+        self.linebreak()
+        commands = 0
+        while not self.ends_list():
+            self.and_or()
+            commands += 1
+            if self.is_op(';', '&'):
+                self.advance()
+            elif self.peek().kind != 'newline':
+                break
+            self.linebreak()
+
+        if not commands:
+            self.error(self.peek())
+
+    def and_or(self):
+        self.pipeline()
+        while self.is_op('&&', '||'):
+            self.advance()
+            self.linebreak()
+            self.pipeline()
+
+    def pipeline(self):
+        if self.is_reserved('!'):
+            self.advance()
+        self.command()
+        while self.is_op('|'):
+            self.advance()
+            self.linebreak()
+            self.command()
+
+    def command(self):
+        tok = self.peek()
+        if tok.kind == 'word' and tok.value in RESERVED:
+            compound = {
+                '{': self.brace_group,
+                'if': self.if_clause,
+                'while': self.while_clause,
+                'until': self.while_clause,
+                'for': self.for_clause,
+                'case': self.case_clause,
+            }.get(tok.value)
+            if not compound:
+                self.error(tok)
+            compound()
+        elif self.is_op('('):
+            self.subshell()
+        else:
+            self.simple_command()
+            return
+
+        while self.is_redirection():
+            self.redirection()
+
+    def is_redirection(self):
+        tok = self.peek()
+        return (tok.kind == 'ionumber' or
+                (tok.kind == 'op' and tok.value in REDIRECTIONS))
+
+    def redirection(self):
+        if self.peek().kind == 'ionumber':
+            self.advance()
+        op = self.advance().value
+        word = self.peek()
+        if word.kind not in ('word', 'ionumber'):
+            self.error(word)
+        self.advance()
+        if op in ('<<', '<<-'):
+            self.lexer.add_heredoc(word.value, op == '<<-')
+
+    def simple_command(self):
+        parts = 0
+        while True:
+            if self.is_redirection():
+                self.redirection()
+            elif self.peek().kind == 'word':
+                word = self.advance()
+                if not parts and self.is_op('('):
+                    if not _NAME.match(word.value):
+                        self.lexer.error(word.pos, "bad function name")
+                    self.function_definition()
+                    return
+            else:
+                break
+            parts += 1
+
+        if not parts:
+            self.error(self.peek())
+
+    def function_definition(self):
+        self.expect_op('(')
+        self.expect_op(')')
+        self.linebreak()
+        self.command()
+
+    def brace_group(self):
+        self.advance()
+        self.compound_list()
+        self.expect_reserved('}')
+
+    def subshell(self):
+        self.advance()
+        self.compound_list()
+        self.expect_op(')')
+
+    def if_clause(self):
+        self.advance()
+        self.compound_list()
+        self.expect_reserved('then')
+        self.compound_list()
+        while self.is_reserved('elif'):
+            self.advance()
+            self.compound_list()
+            self.expect_reserved('then')
+            self.compound_list()
+        if self.is_reserved('else'):
+            self.advance()
+            self.compound_list()
+        self.expect_reserved('fi')
+
+    def while_clause(self):
+        self.advance()
+        self.compound_list()
+        self.do_group()
+
+    def do_group(self):
+        self.expect_reserved('do')
+        self.compound_list()
+        self.expect_reserved('done')
+
+    def for_clause(self):
+        self.advance()
+        name = self.advance()
+        if name.kind != 'word' or not _NAME.match(name.value):
+            self.error(name)
+
+        self.linebreak()
+        if self.is_reserved('in'):
+            self.advance()
+            while self.peek().kind == 'word':
+                self.advance()
+            if self.is_op(';'):
+                self.advance()
+            elif self.peek().kind != 'newline':
+                self.error(self.peek())
+            self.linebreak()
+        elif self.is_op(';'):
+            self.advance()
+            self.linebreak()
+        self.do_group()
+
+    def case_clause(self):
+        self.advance()
+        if self.peek().kind != 'word':
+            self.error(self.peek())
+        self.advance()
+        self.linebreak()
+        self.expect_reserved('in')
+        self.linebreak()
+
+        while not self.is_reserved('esac'):
+            if self.is_op('('):
+                self.advance()
+            while True:
+                if self.peek().kind != 'word':
+                    self.error(self.peek())
+                self.advance()
+                if not self.is_op('|'):
+                    break
+                self.advance()
+            self.expect_op(')')
+
+            self.linebreak()
+            if not self.is_op(';;') and not self.is_reserved('esac'):
+                self.compound_list()
+            if self.is_op(';;'):
+                self.advance()
+                self.linebreak()
+            elif not self.is_reserved('esac'):
+                self.error(self.peek(), 'esac')
+        self.advance()
+
+
+def parse(text):
+    """Checks the shell script @text, raises ShellSyntaxError describing
+    the first syntax error found."""
+
+    Parser(Lexer(text)).parse()
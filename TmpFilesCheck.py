@@ -4,93 +4,152 @@
 # Created on    : Wed Sep 03 10:36 2014
 # Purpose       : Check systemd created tmpfiles are included in filelist
 
-import re
+import collections
 import os.path
 
 from Filter import addDetails, printWarning
 import AbstractCheck
+import FileDispatcher
+import HeaderFiles
+import PayloadAccess
+import Scriptlets
 import stat
-import rpm
+
+# see tmpfiles.d(5)
+INTERESTING_TYPES = ('f', 'F', 'w', 'd', 'D', 'p', 'L', 'c', 'b')
+
+# specifiers with a fixed value for system units, see tmpfiles.d(5)
+SPECIFIERS = {
+    't': '/run',
+    'S': '/var/lib',
+    'C': '/var/cache',
+    'L': '/var/log',
+    'T': '/tmp',
+    'V': '/var/tmp',
+    'h': '/root',
+    '%': '%',
+}
+
+# a single line of a tmpfiles.d file, unset fields are '-'
+TmpFilesEntry = collections.namedtuple(
+    'TmpFilesEntry',
+    ('type', 'path', 'mode', 'uid', 'gid', 'age', 'argument'))
+
+
+def resolve_specifiers(path):
+    """Returns @path with the specifiers replaced, None if it contains a
+    specifier that depends on the system it runs on."""
+
+    if '%' not in path:
+        return path
+
+    ret = []
+    i = 0
+    while i < len(path):
+        if path[i] != '%':
+            ret.append(path[i])
+            i += 1
+            continue
+        value = SPECIFIERS.get(path[i + 1:i + 2])
+        if value is None:
+            return None
+        ret.append(value)
+        i += 2
+    return ''.join(ret)
+
+
+def parse_tmpfiles(lines):
+    """Yields a TmpFilesEntry for each entry in @lines of a tmpfiles.d file.
+    The type is stripped of modifiers like ! and the path has its
+    specifiers resolved, it is None if they cannot be resolved."""
+
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        fields = line.split(None, 6)
+        if len(fields) < 2:
+            continue
+        fields += ['-'] * (7 - len(fields))
+        fields[0] = fields[0][0]
+        fields[1] = resolve_specifiers(fields[1])
+        yield TmpFilesEntry(*fields)
+
+
+def with_parents(paths):
+    """Returns @paths together with all their parent directories."""
+
+    ret = set()
+    for path in paths:
+        path = path.rstrip('/')
+        while path.startswith('/') and path not in ret:
+            ret.add(path)
+            path = os.path.dirname(path)
+    return ret
 
 
 class TmpFilesCheck(AbstractCheck.AbstractCheck):
     '''Check systemd created tmpfiles are included in filelist'''
 
+    needs_payload = True
+
     def __init__(self):
         AbstractCheck.AbstractCheck.__init__(self, "TmpFilesCheck")
+        PayloadAccess.register("TmpFilesCheck", ('/usr/lib/tmpfiles.d/',))
         self._spec_file = None
 
     def check(self, pkg):
         if pkg.isSource():
             return
 
+        files = HeaderFiles.files(pkg)
+        scriptlets = Scriptlets.get(pkg)
+        tmpfiles_created = scriptlets.tmpfiles_created()
+
         # file names handled by systemd-tmpfiles
         tmp_files = set()
-        postin = pkg[rpm.RPMTAG_POSTIN]
-        prein = pkg[rpm.RPMTAG_PREIN]
 
-        # see tmpfiles.d(5)
-        interesting_types = ('f', 'F', 'w', 'd', 'D', 'p', 'L', 'c', 'b')
-
-        for fn, pkgfile in pkg.files().items():
-            if not fn.startswith('/usr/lib/tmpfiles.d/'):
-                continue
+        for fn in FileDispatcher.files(pkg, "TmpFilesCheck"):
+            pkgfile = files[fn]
             if not stat.S_ISREG(pkgfile.mode):
                 printWarning(pkg, "tmpfile-not-regular-file", fn)
                 continue
 
-            basename = os.path.basename(fn)
-            pattern = re.compile(
-                r'systemd-tmpfiles --create .*%s' % re.escape(basename))
-            if (not postin or not pattern.search(postin)) and \
-                    (not prein or not pattern.search(prein)):
+            if os.path.basename(fn) not in tmpfiles_created:
                 printWarning(pkg,
                              'postin-without-tmpfile-creation', fn)
 
-            with open(pkgfile.path) as inputf:
-                for line in inputf:
-                    # skip comments
-                    line = line.split('#')[0].split('\n')[0]
-                    line = line.lstrip()
-                    if not len(line):
-                        continue
-                    line = re.split(r'\s+', line)
-                    # format is
-                    # Type Path        Mode UID  GID  Age Argument
-                    # we only need type and path
-                    if len(line) < 3:
-                        continue
-                    t = line[0]
-                    p = line[1]
-                    if t.endswith('!'):
-                        t = t[:-1]
-                    if t not in interesting_types:
-                        continue
-
-                    tmp_files.add(p)
-
-                    if p not in pkg.files():
-                        printWarning(pkg, "tmpfile-not-in-filelist", p)
-                        continue
-                    if not pkg.files()[p].is_ghost:
-                        printWarning(pkg, "tmpfile-not-ghost", p)
+            with PayloadAccess.open(pkg, fn, 'r') as inputf:
+                entries = [e for e in parse_tmpfiles(inputf)
+                           if e.type in INTERESTING_TYPES and e.path]
+
+            for entry in entries:
+                p = entry.path
+                tmp_files.add(p)
+
+                if p not in files:
+                    printWarning(pkg, "tmpfile-not-in-filelist", p)
+                    continue
+                if not files[p].is_ghost:
+                    printWarning(pkg, "tmpfile-not-ghost", p)
+        PayloadAccess.release(pkg, "TmpFilesCheck")
 
         # now check remaining ghost files that are not already
         # handled by systemd-tmpfiles
-        ghost_files = set(pkg.ghostFiles()) - tmp_files
+        ghost_files = HeaderFiles.ghost_files(pkg) - tmp_files - \
+            HeaderFiles.missingok_files(pkg)
         if ghost_files:
+            have_script = scriptlets.body('pre') or scriptlets.body('post')
+            created = with_parents(scriptlets.tokens('pre', 'post'))
             for f in ghost_files:
-                if f in pkg.missingOkFiles():
-                    continue
-                if not postin and not prein:
+                if not have_script:
                     printWarning(pkg, 'ghost-files-without-postin')
-                if (not postin or f not in postin) and \
-                        (not prein or f not in prein):
+                if f.rstrip('/') not in created:
                     printWarning(pkg,
                                  'postin-without-ghost-file-creation', f)
 
 
-check = TmpFilesCheck()
+check = HeaderFiles.register(TmpFilesCheck())
 
 addDetails(
 'postin-without-ghost-file-creation',
@@ -10,6 +10,10 @@ import json
 import hashlib
 import traceback
 
+import FileDispatcher
+import HeaderFiles
+import PayloadAccess
+
 AUDIT_BUG_URL = "https://en.opensuse.org/openSUSE:Package_security_guidelines#audit_bugs"
 
 
@@ -108,7 +112,7 @@ class AuditEntry(object):
         # checked in setDigests() so we can skip the respective error handling
         # here.
 
-        fileinfos = pkg.files()
+        fileinfos = HeaderFiles.files(pkg)
 
         for path, digest in self.digests().items():
             if self.isSkipDigest(digest):
@@ -127,22 +131,17 @@ class AuditEntry(object):
                 # resolve potential symbolic links
                 #
                 # this function handles both absolute and relative symlinks
-                # and does not access paths outside the RPM.
-                #
-                # it is not safe against symlink loops, however, it will
-                # result in an infinite loop it such cases. But there are
-                # probably a lot of other possibilities to DoS the RPM build
-                # process or rpmlint.
-                dst_info = pkg.readlink(src_info)
+                # and does not access paths outside the RPM. Symlink loops
+                # are reported as broken symlinks.
+                dst_info = HeaderFiles.readlink(pkg, src_info)
 
                 if not dst_info:
                     raise Exception("symlink {} -> {} is broken or pointing outside this RPM".format(src_info.path, src_info.linkto))
 
-                # NOTE: this path is dynamic, rpmlint unpacks the RPM
-                # contents into a temporary directory even when outside the
-                # build environment i.e. the file content should always be
-                # available to us.
-                with open(dst_info.path, 'rb') as fd:
+                # NOTE: the audited paths are registered with PayloadAccess
+                # i.e. the file content is unpacked for us even when outside
+                # the build environment.
+                with PayloadAccess.open(pkg, dst_info.name) as fd:
                     while True:
                         chunk = fd.read(4096)
                         if not chunk:
@@ -341,6 +340,13 @@ class WhitelistChecker(object):
         """
 
         self.m_restricted_paths = restricted_paths
+        self.m_dispatch_key = ("WhitelistChecker", id(self))
+        FileDispatcher.register(self.m_dispatch_key, restricted_paths)
+        # the audited files, which need not be below the restricted paths.
+        # Taken as prefixes this might unpack a few files too many, which
+        # is cheaper than testing every file name against all of them.
+        PayloadAccess.register(self.m_dispatch_key + ("audited",),
+                               tuple(whitelist_entries))
         self.m_whitelist_entries = whitelist_entries
         self.m_error_map = error_map
 
@@ -363,18 +369,11 @@ class WhitelistChecker(object):
         if pkg.isSource():
             return
 
-        files = pkg.files()
         already_tested = set()
 
-        for f in files:
-            for restricted in self.m_restricted_paths:
-                if f.startswith(restricted):
-                    break
-            else:
-                # no match
-                continue
-
-            if f in pkg.ghostFiles():
+        ghost_files = HeaderFiles.ghost_files(pkg)
+        for f in FileDispatcher.files(pkg, self.m_dispatch_key):
+            if f in ghost_files:
                 printError(pkg, self.m_error_map['ghost'], f)
                 continue
 
@@ -422,6 +421,8 @@ class WhitelistChecker(object):
                 printError(pkg, self.m_error_map['changed'], f)
                 continue
 
+        PayloadAccess.release(pkg, self.m_dispatch_key + ("audited",))
+
     def _printVerificationResults(self, verification_results):
         """For the case of changed file digests this function prints the
         encountered and expected digests and paths for diagnostic purposes."""
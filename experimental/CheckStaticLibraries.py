@@ -8,6 +8,7 @@
 
 from Filter import *
 import AbstractCheck
+import ContentScanner
 import rpm
 import re
 import os
@@ -39,6 +40,8 @@ class StaticLibrariesCheck(AbstractCheck.AbstractFilesCheck):
            'this version of PCRE is not compiled with PCRE_UTF8 support', + # libpcre
            'Too many heap sections: Increase MAXHINCR or MAX_HEAP_SECTS',  #gc
            ')')
+        ContentScanner.register('CheckStaticLibs', self.staticlibsre,
+                                r'(?!/usr/lib/debug)')
 
     def check_file(self, pkg, filename):
         if filename.startswith('/usr/lib/debug') or pkg.isSource():
@@ -47,10 +50,10 @@ class StaticLibrariesCheck(AbstractCheck.AbstractFilesCheck):
         if not stat.S_ISREG(pkg.files()[filename][0]):
             return
 
-        grep_result = pkg.grep(self.staticlibsre, filename)
+        grep_result = ContentScanner.search(pkg, 'CheckStaticLibs', filename)
 
         if len(grep_result):
-            printError(pkg, "file-contains-system-library", filename, grep_result)
+            printError(pkg, "file-contains-system-library", filename, grep_result[0].match)
 
 check=StaticLibrariesCheck()
 